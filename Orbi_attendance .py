@@ -1,70 +1,80 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 import time
 import logging
-from datetime import datetime, timedelta
+
+from orbi_clock import ServerClock, next_local_midnight
+from orbi_driver import make_driver
+from orbi_http import SITE_URL
+from orbi_session import ensure_logged_in, prompt_credentials
+from orbi_wait import element_present, log_wait_stats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
-def wait_until_midnight():
+# Submit this long after midnight on the server clock (plus the sync uncertainty), so the
+# click never lands in the previous day
+SUBMIT_MARGIN = 0.02
+
+def wait_until_midnight(clock, warm=None):
     """
-    Calculate the time difference to midnight and wait accordingly.
+    Wait until just after midnight on Orbi's clock and return the server midnight timestamp.
+    Sleeps coarsely, re-syncs the clock a minute ahead, calls warm() a few seconds ahead
+    and spins for the last few hundred milliseconds.
     """
-    now = datetime.now()
-    midnight = datetime.combine(now + timedelta(days=1), datetime.min.time())  # Set to next day's 12:00 AM
-    time_to_midnight = (midnight - now).total_seconds()
-    logging.info(f"Waiting {time_to_midnight:.2f} seconds until midnight...")
-    time.sleep(time_to_midnight)
+    midnight = next_local_midnight(clock.now())
+    target = midnight + SUBMIT_MARGIN + (clock.uncertainty or 0.0)
+    logging.info(f"Waiting {clock.to_local(target) - time.time():.2f} seconds until midnight (server clock)...")
+    clock.sleep_until(target, warm=warm)
+    return midnight
 
-def main():
-    # Configure Chrome WebDriver options
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument("--headless")  # Run browser in headless mode
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920x1080")
+def warm_up(driver):
+    """Makes a throwaway request from the page so the browser's connection to Orbi is open at midnight."""
+    driver.execute_script("fetch('/robots.txt', {cache: 'no-store'}).catch(() => {});")
 
+def main(credentials=prompt_credentials):
     try:
-        # Prompt for login credentials
-        username = input("Enter your Orbi username/email: ")
-        password = input("Enter your Orbi password: ")
-
-        # Initialize WebDriver
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.get("https://login.orbi.kr/login")
+        # Initialize WebDriver (headless, images blocked, eager page loads)
+        driver = make_driver("interactive")
 
-        # Log in
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.NAME, "username"))).send_keys(username)
-        password_field = driver.find_element(By.NAME, "password")
-        password_field.send_keys(password)
-        password_field.send_keys(Keys.RETURN)
-        time.sleep(3)  # Wait for login to complete
+        # Log in, reusing the saved session if there is one (credentials are only prompted for if not)
+        if not ensure_logged_in(driver, credentials):
+            return
 
         logging.info("Login successful!")
 
         # Navigate to attendance page
-        driver.get("https://orbi.kr/amusement/attendance")
+        driver.get(f"{SITE_URL}/amusement/attendance")
 
         # Input "q" into the attendance form
-        WebDriverWait(driver, 10).until(EC.presence_of_element_located((By.CLASS_NAME, "greets-wrap")))
+        if not element_present(driver, By.CLASS_NAME, "greets-wrap", 10):
+            return
         input_box = driver.find_element(By.CSS_SELECTOR, ".greets-wrap .input-wrap")
         input_box.send_keys("q")
         logging.info('Typed "q" into the input box.')
 
-        # Wait until midnight
-        wait_until_midnight()
+        # Resolve the submit button now, so nothing but the click is left for midnight
+        submit_button = driver.find_element(By.CSS_SELECTOR, ".greets-wrap button.submit")
+
+        # Wait until midnight on the server's clock
+        clock = ServerClock()
+        clock.sync()
+        midnight = wait_until_midnight(clock, warm=lambda: warm_up(driver))
 
         # Click the submit button at exactly midnight
-        submit_button = driver.find_element(By.CSS_SELECTOR, ".greets-wrap button.submit")
+        clicked_at = clock.now()
+        click_start = time.perf_counter()
         submit_button.click()
-        logging.info("Attendance submitted successfully at exactly 12:00 AM!")
+        click_latency = time.perf_counter() - click_start
+        logging.info(
+            f"Attendance submitted {(clicked_at - midnight) * 1000:.0f}ms after midnight (server clock); "
+            f"the click took {click_latency * 1000:.0f}ms. Clock offset {clock.offset * 1000:+.0f}ms "
+            f"(±{(clock.uncertainty or 0) * 1000:.0f}ms)."
+        )
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
     finally:
+        log_wait_stats()
         if 'driver' in locals():
             driver.quit()
 
@@ -0,0 +1,240 @@
+"""
+Batch scraping of many imins (a watch list) in one run.
+
+    python orbi.py scrape-batch watchlist.txt --incremental --format jsonl
+    python imin_scraper.py watchlist.txt
+
+The list file holds one imin number per line (blank lines and # comments are ignored).
+Every imin is a job in one round-robin queue: a job fetches one page, then goes to the back
+of the queue, so an imin with thousands of pages cannot hold up the rest. Up to `window`
+pages (each from a different imin) are in flight at once over one shared connection pool,
+and a single token bucket caps the requests to orbi.kr for the whole batch.
+
+Each imin's next page is saved after every page, so an interrupted batch resumes where it
+stopped when run again with the same progress file. Once every imin is done the progress is
+cleared and the next run starts over.
+"""
+import logging
+import sqlite3
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from imin_index import DEFAULT_INDEX_PATH, SeenPostIndex
+from imin_parser import get_parser
+from imin_scraper import fetch_page, handle_page
+from imin_search import TitleSearchIndex
+from imin_sinks import SINKS, open_sink
+from orbi_http import RateLimiter, make_session
+
+DEFAULT_PROGRESS_PATH = "imin_batch.sqlite3"
+
+# A page that fails this many times in a row leaves its imin for the next run
+MAX_PAGE_FAILURES = 3
+
+def read_imin_list(path):
+    """Returns the imin numbers in a list file, in order and without duplicates."""
+    imins = []
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            imin = line.split("#", 1)[0].strip()
+            if imin and imin not in imins:
+                imins.append(imin)
+    return imins
+
+class BatchProgress:
+    """
+    SQLite record of how far each imin in a batch has got: its next page, posts so far, whether
+    it is done, and the newest post the seen-post index held when its job started.
+    """
+
+    def __init__(self, path=DEFAULT_PROGRESS_PATH):
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS progress (
+                    imin TEXT PRIMARY KEY,
+                    next_page INTEGER NOT NULL,
+                    posts INTEGER NOT NULL,
+                    done INTEGER NOT NULL,
+                    updated_at REAL NOT NULL,
+                    known_post_id INTEGER
+                )
+                """
+            )
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(progress)")]
+            if "known_post_id" not in columns:
+                # Progress files from before the column existed
+                self.connection.execute("ALTER TABLE progress ADD COLUMN known_post_id INTEGER")
+
+    def load(self):
+        """Returns {imin: (next_page, posts, done, known_post_id)}."""
+        rows = self.connection.execute("SELECT imin, next_page, posts, done, known_post_id FROM progress")
+        return {imin: (next_page, posts, bool(done), known) for imin, next_page, posts, done, known in rows}
+
+    def save(self, imin, next_page, posts, done=False, known_post_id=None):
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO progress (imin, next_page, posts, done, updated_at, known_post_id) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (imin, next_page, posts, int(done), time.time(), known_post_id),
+            )
+
+    def clear(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM progress")
+
+    def close(self):
+        self.connection.close()
+
+class IminJob:
+    """
+    One imin's place in the batch: the page to fetch next, whether its log is appended to and
+    the newest post already indexed when the job started (older posts end an incremental job).
+    """
+
+    def __init__(self, imin, page=1, posts=0, append=False, known_post_id=None):
+        self.imin = imin
+        self.page = page
+        self.posts = posts
+        self.append = append
+        self.known_post_id = known_post_id
+        self.failures = 0
+
+def scrape_imin_batch(imins, window=8, max_rate=5.0, burst=4, parser=None, incremental=False,
+                      index_path=DEFAULT_INDEX_PATH, output_format="text", cache=None, session=None,
+                      progress_path=DEFAULT_PROGRESS_PATH, search_index_path=None, restart=False):
+    """
+    Scrapes every imin in `imins` into its own {imin}_log file, as scrape_imin_titles would, but
+    as one fair, rate-limited batch (see the module docstring). max_rate caps requests per second
+    to orbi.kr across the whole batch (None for no cap), allowing bursts of up to `burst`.
+    parser, incremental, index_path, output_format, cache, session and search_index_path work as
+    in scrape_imin_titles. restart=True ignores saved progress.
+
+    Returns {imin: posts written} for the imins finished in this run.
+    """
+    imins = list(dict.fromkeys(imins))
+    parse_posts = get_parser(parser)
+    owns_session = session is None
+    if owns_session:
+        session = make_session(pool_size=window, cache=cache)
+    rate_limiter = RateLimiter(max_rate, burst)
+    extension = SINKS[output_format].extension
+
+    progress = BatchProgress(progress_path)
+    index = SeenPostIndex(index_path) if incremental else None
+    search_index = TitleSearchIndex(search_index_path) if search_index_path else None
+    if restart:
+        progress.clear()
+
+    saved = progress.load()
+    queue = deque()
+    finished = {}
+    for imin in imins:
+        next_page, posts, done, known_post_id = saved.get(imin, (1, 0, False, None))
+        if done:
+            continue
+        if next_page > 1:
+            # Started in an interrupted run; carry on after what it wrote
+            queue.append(IminJob(imin, next_page, posts, append=True, known_post_id=known_post_id))
+        else:
+            known_post_id = index.newest_post_id(imin) if index else None
+            queue.append(IminJob(imin, append=known_post_id is not None, known_post_id=known_post_id))
+    skipped = len(imins) - len(queue)
+    if skipped:
+        logging.info(f"Resuming batch: {skipped} of {len(imins)} imins were finished in an earlier run.")
+
+    def finish(job):
+        progress.save(job.imin, job.page, job.posts, done=True, known_post_id=job.known_post_id)
+        finished[job.imin] = job.posts
+        print(f"Finished {job.imin}: {job.posts} titles written to {job.imin}_log.{extension}")
+
+    def handle(job, response):
+        """Writes one fetched page out. Returns True if the imin has more pages to fetch."""
+        if response.status_code == 429 or response.status_code >= 500:
+            # Worth retrying, unlike other errors, which end the imin as in scrape_imin_titles
+            response.raise_for_status()
+        page_posts = handle_page(response, job.page, parse_posts)
+        if page_posts is None:
+            finish(job)
+            return False
+
+        records = [{"imin": job.imin, "page": job.page, **post} for post in page_posts]
+        reached_seen = False
+        if index:
+            seen = index.seen_ids(job.imin, [record["post_id"] for record in records])
+            new_records = []
+            for record in records:
+                if record["post_id"] in seen:
+                    # Results are newest first, so everything from the first post indexed before this job is old
+                    if job.known_post_id is not None and record["post_id"] <= job.known_post_id:
+                        print(f"Reached already scraped posts of {job.imin} on page {job.page}.")
+                        reached_seen = True
+                        break
+                    # Written by this job before an interruption; new posts since have pushed it onto a later page
+                    continue
+                new_records.append(record)
+            records = new_records
+
+        with open_sink(output_format, f"{job.imin}_log.{extension}", append=job.append) as sink:
+            for record in records:
+                sink.write(record)
+        job.append = True
+        job.posts += len(records)
+        job.page += 1
+        # Saved before the seen-post index, so a crash in between repeats posts rather than skipping them
+        progress.save(job.imin, job.page, job.posts, known_post_id=job.known_post_id)
+        if index:
+            index.add_posts(job.imin, records)
+        if search_index:
+            search_index.add_records(records)
+
+        if reached_seen:
+            finish(job)
+            return False
+        return True
+
+    in_flight = {}
+    try:
+        with ThreadPoolExecutor(max_workers=window) as executor:
+            while queue or in_flight:
+                # Each imin has at most one page in flight; the rest wait their turn in the queue
+                while queue and len(in_flight) < window:
+                    job = queue.popleft()
+                    print(f"Fetching page {job.page} for {job.imin}...")
+                    in_flight[executor.submit(fetch_page, session, job.imin, job.page, rate_limiter)] = job
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    job = in_flight.pop(future)
+                    try:
+                        more = handle(job, future.result())
+                        job.failures = 0
+                    except Exception as e:
+                        job.failures += 1
+                        more = job.failures < MAX_PAGE_FAILURES
+                        logging.error(f"Page {job.page} of {job.imin} failed ({job.failures}/{MAX_PAGE_FAILURES}): {e}")
+                        if not more:
+                            logging.error(f"Leaving {job.imin} at page {job.page} for the next run.")
+                    if more:
+                        queue.append(job)
+
+        if len(finished) < len(imins) - skipped:
+            logging.warning(f"{len(imins) - skipped - len(finished)} imins did not finish; run the batch again to resume them.")
+        else:
+            # The whole batch is done, so the next run starts from the first page again
+            progress.clear()
+    finally:
+        for future in in_flight:
+            future.cancel()
+        progress.close()
+        if search_index:
+            search_index.close()
+        if index:
+            index.close()
+        if owns_session:
+            session.close()
+
+    print(f"Batch complete: {len(finished)} imins, {sum(finished.values())} titles.")
+    return finished
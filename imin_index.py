@@ -0,0 +1,63 @@
+import sqlite3
+from datetime import datetime
+
+DEFAULT_INDEX_PATH = "imin_index.sqlite3"
+
+class SeenPostIndex:
+    """
+    SQLite index of the posts already scraped for each imin, keyed by (imin, post_id).
+    Used by incremental scraping to stop paginating at the first post it has stored.
+    """
+
+    def __init__(self, path=DEFAULT_INDEX_PATH):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS posts (
+                imin TEXT NOT NULL,
+                post_id INTEGER NOT NULL,
+                title TEXT NOT NULL,
+                url TEXT,
+                scraped_at TEXT NOT NULL,
+                PRIMARY KEY (imin, post_id)
+            ) WITHOUT ROWID
+            """
+        )
+        self.connection.commit()
+
+    def has_posts(self, imin):
+        """Returns True if anything has been stored for this imin yet."""
+        row = self.connection.execute("SELECT 1 FROM posts WHERE imin = ? LIMIT 1", (imin,)).fetchone()
+        return row is not None
+
+    def newest_post_id(self, imin):
+        """Returns the highest post id stored for this imin, or None if there are none."""
+        return self.connection.execute("SELECT MAX(post_id) FROM posts WHERE imin = ?", (imin,)).fetchone()[0]
+
+    def seen_ids(self, imin, post_ids):
+        """Returns the subset of post_ids already stored for this imin."""
+        post_ids = [post_id for post_id in post_ids if post_id is not None]
+        if not post_ids:
+            return set()
+        placeholders = ",".join("?" * len(post_ids))
+        rows = self.connection.execute(
+            f"SELECT post_id FROM posts WHERE imin = ? AND post_id IN ({placeholders})",
+            [imin, *post_ids],
+        )
+        return {row[0] for row in rows}
+
+    def add_posts(self, imin, posts):
+        """Stores posts (records with a post_id) in a single transaction, ignoring ones already stored."""
+        scraped_at = datetime.now().isoformat(timespec="seconds")
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR IGNORE INTO posts (imin, post_id, title, url, scraped_at) VALUES (?, ?, ?, ?, ?)",
+                [
+                    (imin, post["post_id"], post["title"], post["url"], scraped_at)
+                    for post in posts
+                    if post["post_id"] is not None
+                ],
+            )
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,118 @@
+import re
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the BeautifulSoup backends always work
+    etree = None
+
+from orbi_http import SITE_URL
+
+
+# Only the post list is ever read, so the strainer backend skips building the rest of the tree
+POST_LIST_STRAINER = SoupStrainer("ul", class_="post-list")
+
+# Number of leading non-notice posts (the pinned popular posts) to skip on every page
+SKIPPED_POSTS = 3
+
+# Post links look like /00071234567 or /00071234567/some-slug
+POST_ID_PATTERN = re.compile(r"^/?(\d+)(?:[/?#]|$)")
+
+def _bytes_encoding(content, encoding):
+    # Encodings only apply to undecoded bytes; str input is passed through as is
+    return encoding if isinstance(content, bytes) else None
+
+def make_post(title, href):
+    """Builds a post record from a title and the (possibly relative) link to the post."""
+    post_id = None
+    url = None
+    if href:
+        url = urljoin(SITE_URL, href)
+        match = POST_ID_PATTERN.match(href[len(SITE_URL):] if href.startswith(SITE_URL) else href)
+        if match:
+            post_id = int(match.group(1))
+    return {"title": title, "post_id": post_id, "url": url}
+
+def _soup_posts(soup):
+    # Find the 'post-list' class container
+    post_list = soup.find("ul", class_="post-list")
+    if not post_list:
+        return None
+
+    # Skip notices and the first three valid posts
+    valid_posts = [
+        li for li in post_list.find_all("li")
+        if "notice" not in li.get("class", [])
+    ][SKIPPED_POSTS:]
+
+    posts = []
+    for post in valid_posts:
+        title = post.find("p", class_="title")  # Look the title up once per post
+        if title:
+            # Prefer the link inside the title, then any link in the item
+            link = title.find("a", href=True) or post.find("a", href=True)
+            posts.append(make_post(title.text.strip(), link["href"] if link else None))
+    return posts
+
+def parse_posts_html_parser(content, encoding=None):
+    """Parses the whole page with BeautifulSoup's built-in html.parser."""
+    soup = BeautifulSoup(content, "html.parser", from_encoding=_bytes_encoding(content, encoding))
+    return _soup_posts(soup)
+
+def parse_posts_strainer(content, encoding=None):
+    """Parses only the post list with html.parser and a SoupStrainer."""
+    soup = BeautifulSoup(
+        content, "html.parser",
+        parse_only=POST_LIST_STRAINER,
+        from_encoding=_bytes_encoding(content, encoding),
+    )
+    return _soup_posts(soup)
+
+# XPath equivalents of the selectors above; class tests match on whole class tokens like bs4 does
+_POST_LIST_XPATH = "//ul[contains(concat(' ', normalize-space(@class), ' '), ' post-list ')]"
+_POST_XPATH = ".//li[not(contains(concat(' ', normalize-space(@class), ' '), ' notice '))]"
+_TITLE_XPATH = ".//p[contains(concat(' ', normalize-space(@class), ' '), ' title ')]"
+_HREF_XPATH = "string((.//a[@href])[1]/@href)"
+
+def parse_posts_lxml(content, encoding=None):
+    """Parses the page with lxml's C parser straight from the response bytes."""
+    if not content.strip():
+        return None
+    parser = etree.HTMLParser(encoding=_bytes_encoding(content, encoding))
+    root = etree.fromstring(content, parser)
+    if root is None:
+        return None
+
+    post_lists = root.xpath(_POST_LIST_XPATH)
+    if not post_lists:
+        return None
+
+    posts = []
+    for post in post_lists[0].xpath(_POST_XPATH)[SKIPPED_POSTS:]:
+        title = post.xpath(_TITLE_XPATH)
+        if title:
+            href = title[0].xpath(_HREF_XPATH) or post.xpath(_HREF_XPATH)
+            posts.append(make_post("".join(title[0].itertext()).strip(), href or None))
+    return posts
+
+PARSERS = {
+    "html.parser": parse_posts_html_parser,
+    "strainer": parse_posts_strainer,
+}
+if etree is not None:
+    PARSERS["lxml"] = parse_posts_lxml
+
+def get_parser(name=None):
+    """
+    Returns the post parser registered under `name`, or the fastest installed one if no name is given.
+    Each parser takes the page as bytes or str plus an optional encoding and returns a list of
+    {"title", "post_id", "url"} records, or None if the page has no post list.
+    """
+    if name is None:
+        name = "lxml" if "lxml" in PARSERS else "strainer"
+    try:
+        return PARSERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown parser '{name}'. Available: {', '.join(PARSERS)}") from None
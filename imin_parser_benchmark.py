@@ -0,0 +1,71 @@
+import argparse
+import time
+
+from bs4 import BeautifulSoup
+
+from imin_parser import PARSERS
+
+def reference_titles(html):
+    """The original imin_scraper parser, kept verbatim as the baseline for speed and output."""
+    soup = BeautifulSoup(html, 'html.parser')
+    post_list = soup.find("ul", class_="post-list")
+    if not post_list:
+        return None
+    list_items = post_list.find_all("li")
+    valid_posts = [
+        li for li in list_items
+        if "notice" not in li.get("class", [])
+    ][3:]
+    return [
+        post.find("p", class_="title").text.strip()
+        for post in valid_posts
+        if post.find("p", class_="title")
+    ]
+
+def titles_of(posts):
+    return None if posts is None else [post["title"] for post in posts]
+
+def time_parser(parse, pages, repeat):
+    """Returns the best time in seconds to parse every page once."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            parse(page)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        description="Compare imin_parser backends against the original parser on saved search result pages."
+    )
+    arg_parser.add_argument("pages", nargs="+", help="Saved /search?type=imin HTML files")
+    arg_parser.add_argument("--repeat", type=int, default=5, help="Runs per backend; the best run is reported")
+    arg_parser.add_argument("--encoding", default="utf-8", help="Encoding of the saved pages")
+    args = arg_parser.parse_args()
+
+    raw_pages = []
+    for path in args.pages:
+        with open(path, "rb") as file:
+            raw_pages.append(file.read())
+    # The original parser ran on response.text, so it gets the decode cost included
+    expected = [reference_titles(page.decode(args.encoding)) for page in raw_pages]
+
+    baseline = time_parser(lambda page: reference_titles(page.decode(args.encoding)), raw_pages, args.repeat)
+    print(f"{'backend':<12} {'ms/page':>9} {'speedup':>8}  output")
+    print(f"{'reference':<12} {baseline * 1000 / len(raw_pages):>9.2f} {1.0:>7.2f}x  -")
+
+    all_match = True
+    for name, parse in PARSERS.items():
+        results = [titles_of(parse(page, args.encoding)) for page in raw_pages]
+        mismatches = [path for path, got, want in zip(args.pages, results, expected) if got != want]
+        all_match = all_match and not mismatches
+
+        elapsed = time_parser(lambda page: parse(page, args.encoding), raw_pages, args.repeat)
+        status = "matches" if not mismatches else f"DIFFERS on {', '.join(mismatches)}"
+        print(f"{name:<12} {elapsed * 1000 / len(raw_pages):>9.2f} {baseline / elapsed:>7.2f}x  {status}")
+
+    return 0 if all_match else 1
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,70 +1,221 @@
 # File: imin_scraper.py
 
-import requests
-from bs4 import BeautifulSoup
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 
-def scrape_imin_titles(imin_number):
-    base_url = "https://orbi.kr/search"
+from imin_index import DEFAULT_INDEX_PATH, SeenPostIndex
+from imin_parser import get_parser
+from imin_search import INGEST_BATCH_SIZE, TitleSearchIndex
+from imin_sinks import SINKS, open_sink
+from orbi_cache import HttpCache
+from orbi_http import SITE_URL, RateLimiter, make_session
+from orbi_metrics import METRICS
+
+BASE_URL = f"{SITE_URL}/search"
+
+def fetch_page(session, imin_number, page, rate_limiter=None):
+    """Fetches one search result page and returns the response."""
+    # Construct URL with query parameters
+    params = {
+        "type": "imin",
+        "q": imin_number,
+        "page": page  # Add the page parameter for pagination
+    }
+    if rate_limiter:
+        rate_limiter.wait(BASE_URL)
+    return session.get(BASE_URL, params=params)
+
+def handle_page(response, page, parse_posts):
+    """
+    Checks a fetched page and returns its posts, or None if pagination should stop.
+    """
+    if response.status_code != 200:
+        print(f"Failed to fetch page {page}. HTTP Status Code: {response.status_code}")
+        return None
+
+    # Hand the raw bytes to the parser so it can skip the str decode
+    with METRICS.timer("orbi_parse_seconds", parser=parse_posts.__name__):
+        page_posts = parse_posts(response.content, response.encoding)
+    if page_posts is None:
+        print("No more 'post-list' found. Stopping.")
+        return None
+
+    # Stop if no valid titles are found
+    if not page_posts:
+        print("No titles found on this page. Stopping.")
+        return None
+
+    # Filter out any posts with empty titles
+    return [post for post in page_posts if post["title"]]
+
+def iter_pages_sequential(session, imin_number, parse_posts, rate_limiter=None):
+    """Fetches and parses pages one at a time, yielding (page, posts) until the results run out."""
     page = 1
-    titles = []
 
     while True:
-        # Construct URL with query parameters
-        params = {
-            "type": "imin",
-            "q": imin_number,
-            "page": page  # Add the page parameter for pagination
-        }
         print(f"Fetching page {page} for {imin_number}...")
+        response = fetch_page(session, imin_number, page, rate_limiter)
+        page_posts = handle_page(response, page, parse_posts)
+        if page_posts is None:
+            return
 
-        # Make a GET request to the page
-        response = requests.get(base_url, params=params)
-        if response.status_code != 200:
-            print(f"Failed to fetch page {page}. HTTP Status Code: {response.status_code}")
-            break
-
-        # Parse the HTML content
-        soup = BeautifulSoup(response.text, 'html.parser')
-
-        # Find the 'post-list' class container
-        post_list = soup.find("ul", class_="post-list")
-        if not post_list:
-            print("No more 'post-list' found. Stopping.")
-            break
-
-        # Find all list items in the post list
-        list_items = post_list.find_all("li")
-
-        # Skip the first three list items with the 'notice' class
-        valid_posts = [
-            li for li in list_items
-            if "notice" not in li.get("class", [])  # Exclude 'notice' class
-        ][3:]  # Skip the first three valid posts
-
-        # Extract titles from the <p> tags with class "title"
-        page_titles = [
-            post.find("p", class_="title").text.strip()
-            for post in valid_posts
-            if post.find("p", class_="title")  # Ensure <p class="title"> exists
-        ]
-
-        # Stop if no valid titles are found
-        if not page_titles:
-            print("No titles found on this page. Stopping.")
-            break
-
-        # Filter out any empty titles and append valid ones to the list
-        titles.extend([title for title in page_titles if title])
+        yield page, page_posts
         page += 1  # Move to the next page
 
-    # Write titles to a text file with one title per line and no blank lines
-    log_filename = f"{imin_number}_log.txt"
-    with open(log_filename, "w", encoding="utf-8") as file:
-        file.write("\n".join(titles))  # Join titles with a newline separator
-    
+def iter_pages_concurrent(session, imin_number, parse_posts, window, rate_limiter=None, probe_first=False):
+    """
+    Keeps up to `window` pages in flight ahead of the parser. Pages are still
+    yielded in order, so posts come out in the same order as sequential mode.
+    With probe_first, page 1 is fetched alone and the window only opens once the caller asks
+    for page 2, so a caller that stops at page 1 costs a single request.
+    """
+    pending = {}
+    page = 1
+    next_page = 1
+
+    with ThreadPoolExecutor(max_workers=window) as executor:
+        def submit(page_number):
+            print(f"Fetching page {page_number} for {imin_number}...")
+            pending[page_number] = executor.submit(
+                fetch_page, session, imin_number, page_number, rate_limiter
+            )
+
+        for next_page in range(1, (1 if probe_first else window) + 1):
+            submit(next_page)
+
+        try:
+            while True:
+                response = pending.pop(page).result()
+                page_posts = handle_page(response, page, parse_posts)
+                if page_posts is None:
+                    return
+
+                yield page, page_posts
+                # Keep the window full
+                while next_page < page + window:
+                    next_page += 1
+                    submit(next_page)
+                page += 1
+        finally:
+            # Drop requests for pages past the end (or past where the caller stopped) that have not started yet
+            for future in pending.values():
+                future.cancel()
+
+def iter_imin_posts(imin_number, concurrent=False, window=8, max_rate=5.0, parser=None, index=None,
+                    cache=None, session=None):
+    """
+    Yields the imin's posts newest first as {"imin", "page", "post_id", "title", "url"} records.
+
+    Pages are fetched lazily as the caller consumes records, so memory stays constant however
+    long the imin's history is. concurrent, window, max_rate, parser and cache work as in
+    scrape_imin_titles. Given a SeenPostIndex, iteration stops at the first post already stored in it.
+    A session passed in (e.g. one shared between jobs) is used instead of a new one and left open.
+    """
+    parse_posts = get_parser(parser)
+    owns_session = session is None
+    if owns_session:
+        session = make_session(pool_size=window if concurrent else 1, cache=cache)
+    rate_limiter = RateLimiter(max_rate)
+
+    if concurrent:
+        # An incremental run usually stops on page 1, so nothing is fetched ahead of it
+        pages = iter_pages_concurrent(session, imin_number, parse_posts, window, rate_limiter, probe_first=index is not None)
+    else:
+        pages = iter_pages_sequential(session, imin_number, parse_posts, rate_limiter)
+
+    try:
+        with closing(pages):
+            for page, page_posts in pages:
+                seen = index.seen_ids(imin_number, [post["post_id"] for post in page_posts]) if index else ()
+                for post in page_posts:
+                    # Results are newest first, so everything from the first stored post on is old
+                    if post["post_id"] in seen:
+                        print(f"Reached already scraped posts on page {page}. Stopping.")
+                        return
+                    yield {"imin": imin_number, "page": page, **post}
+    finally:
+        if owns_session:
+            session.close()
+
+def scrape_imin_titles(imin_number, concurrent=False, window=8, max_rate=5.0, parser=None,
+                       incremental=False, index_path=DEFAULT_INDEX_PATH, output_format="text", cache=None,
+                       session=None, search_index_path=None):
+    """
+    Scrapes every post title written by the given imin and writes them to {imin_number}_log.txt.
+
+    With concurrent=True up to `window` pages are fetched ahead of the parser over a
+    shared keep-alive session. max_rate caps requests per second to orbi.kr (None for no cap).
+    parser picks a backend from imin_parser.PARSERS; the fastest installed one is used by default.
+
+    With incremental=True scraped posts are recorded in a SeenPostIndex at index_path.
+    Later runs stop at the first post already in the index and append only the new
+    titles to the log file. While such a run is in progress the new titles stream into
+    {log}.partial; they are appended to the log and indexed only once the run completes.
+
+    output_format is "text" (titles only), "jsonl" or "csv" (full records); the file extension
+    follows the format. Records are written and flushed as they are scraped.
+
+    Given an orbi_cache.HttpCache, search pages are served from and revalidated against it.
+    A requests.Session from orbi_http.make_session can be passed in to share its connections.
+    With search_index_path, posts are also added to the imin_search.TitleSearchIndex there as they are scraped.
+    """
+    index = SeenPostIndex(index_path) if incremental else None
+    append = incremental and index.has_posts(imin_number)
+    new_posts = []
+    search_index = TitleSearchIndex(search_index_path) if search_index_path else None
+    searchable = []
+
+    log_filename = f"{imin_number}_log.{SINKS[output_format].extension}"
+    # Appending straight to the log would leave an interrupted run's titles in it but not in the
+    # index, so the next run would append them again
+    output_filename = f"{log_filename}.partial" if append else log_filename
+    try:
+        with open_sink(output_format, output_filename) as sink:
+            for post in iter_imin_posts(imin_number, concurrent, window, max_rate, parser, index, cache, session):
+                sink.write(post)
+                if index:
+                    new_posts.append(post)
+                if search_index:
+                    searchable.append(post)
+                    if len(searchable) >= INGEST_BATCH_SIZE:
+                        search_index.add_records(searchable)
+                        searchable.clear()
+
+        if append:
+            with open_sink(output_format, log_filename, append=True) as sink:
+                for post in new_posts:
+                    sink.write(post)
+            os.remove(output_filename)
+
+        if index:
+            # Record posts only once the output is complete, so an interrupted run is redone in full
+            index.add_posts(imin_number, new_posts)
+            print(f"{len(new_posts)} new titles found.")
+    finally:
+        if index:
+            index.close()
+        if search_index:
+            # Already indexed posts are ignored, so indexing what an interrupted run scraped is harmless
+            search_index.add_records(searchable)
+            search_index.close()
+
     print(f"Scraping complete. Titles written to {log_filename}")
 
 if __name__ == "__main__":
-    # Get the imin number from the user
-    imin_number = input("Enter the imin number: ")
-    scrape_imin_titles(imin_number)
\ No newline at end of file
+    import sys
+
+    cache = HttpCache()
+    try:
+        if len(sys.argv) > 1:
+            # A list file of imins: scrape them all as one batch
+            from imin_batch import read_imin_list, scrape_imin_batch
+
+            scrape_imin_batch(read_imin_list(sys.argv[1]), cache=cache)
+        else:
+            # Get the imin number from the user
+            imin_number = input("Enter the imin number: ")
+            scrape_imin_titles(imin_number, concurrent=True, cache=cache)
+        print(cache.summary())
+    finally:
+        cache.close()
@@ -0,0 +1,255 @@
+"""
+Local full-text search over scraped post titles, backed by SQLite FTS5.
+
+Korean titles do not split into words the way FTS tokenizers expect: particles attach to
+nouns (국어가, 국어는) and compounds are written without spaces (수능국어). Titles are
+therefore indexed as overlapping character bigrams of each word, plus a marker for each word's
+first character, so that any substring of two or more characters matches (like a CJK bigram
+analyzer). The trigram tokenizer could not do that, since it never matches terms shorter than
+three characters, and most Korean words are two.
+
+    python imin_search.py ingest 12345_log.jsonl 67890_log.csv --from-index imin_index.sqlite3
+    python imin_search.py query '국어 "질문 있습니다" 수능*' --imin 12345
+
+Query terms are ANDed: a bare term matches anywhere in a title, a term ending in * matches
+the start of a word, and a "quoted phrase" must appear exactly.
+"""
+import argparse
+import csv
+import json
+import logging
+import os
+import re
+import shlex
+import sqlite3
+import sys
+import time
+
+DEFAULT_SEARCH_PATH = "imin_search.sqlite3"
+
+# Records are committed this many at a time during bulk ingest
+INGEST_BATCH_SIZE = 5000
+
+# Runs of letters and digits; everything else separates words
+WORD_PATTERN = re.compile(r"[^\W_]+")
+
+def words(text):
+    return WORD_PATTERN.findall(text.lower())
+
+def word_grams(word):
+    """A word-start marker, then the word's bigrams (or the word itself if it is one character)."""
+    grams = ["^" + word[0]]
+    if len(word) == 1:
+        grams.append(word)
+    grams.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return grams
+
+def title_grams(title):
+    """The space-separated tokens a title is indexed under."""
+    return " ".join(gram for word in words(title) for gram in word_grams(word))
+
+def term_expression(term):
+    """
+    Turns one query term into an FTS5 phrase over the indexed grams, or None if the index
+    cannot narrow it down (a lone character that need not start a word).
+    """
+    prefix = term.endswith("*")
+    parts = words(term.rstrip("*"))
+    grams = []
+    for i, word in enumerate(parts):
+        # Every word after the first starts a word; the first does only in a prefix term
+        if i > 0 or prefix:
+            grams.append("^" + word[0])
+            # A one-character word is indexed as itself, but a one-character prefix can start a longer word
+            if len(word) == 1 and not (prefix and i == len(parts) - 1):
+                grams.append(word)
+        elif len(word) == 1:
+            # Its grams depend on the next character in the title, which is unknown
+            continue
+        grams.extend(word[j:j + 2] for j in range(len(word) - 1))
+    return '"' + " ".join(grams) + '"' if grams else None
+
+def parse_query(query):
+    """Splits a query into (FTS5 expression or None, [substrings every result must contain])."""
+    try:
+        terms = shlex.split(query)
+    except ValueError:
+        terms = query.split()  # An unbalanced quote; treat the quote as text
+    expressions, substrings = [], []
+    for term in terms:
+        expression = term_expression(term)
+        if expression:
+            expressions.append(expression)
+        # The grams ignore spaces and punctuation, so anything beyond one plain word is checked exactly
+        if len(words(term.rstrip("*"))) != 1 or not expression:
+            substrings.append(term.lower().rstrip("*"))
+    return " AND ".join(expressions) or None, substrings
+
+class TitleSearchIndex:
+    """
+    Full-text index of scraped post records ({"imin", "post_id", "title", "url", ...}).
+    Adding a record that is already indexed (same imin and post id, or same imin and title
+    for records without a post id) does nothing, so sources can be re-ingested freely.
+    """
+
+    def __init__(self, path=DEFAULT_SEARCH_PATH):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS titles (
+                    id INTEGER PRIMARY KEY,
+                    record_key TEXT NOT NULL UNIQUE,
+                    imin TEXT NOT NULL,
+                    post_id INTEGER,
+                    title TEXT NOT NULL,
+                    url TEXT
+                )
+                """
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS titles_imin ON titles (imin)")
+            # Contentless: the grams are only needed for matching, titles are read from the table above
+            self.connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS title_grams USING fts5("
+                "grams, content='', tokenize=\"unicode61 remove_diacritics 0 tokenchars '^'\")"
+            )
+
+    def add_records(self, records, batch_size=INGEST_BATCH_SIZE):
+        """Indexes records, committing every batch_size. Returns the number newly added."""
+        added = 0
+        batch = []
+        cursor = self.connection.cursor()
+        for record in records:
+            title = (record.get("title") or "").strip()
+            if not title:
+                continue
+            imin = str(record["imin"])
+            post_id = record.get("post_id")
+            if post_id not in (None, ""):
+                # Post numbers are site-wide and increase over time, so rowid order is newest-post order
+                post_id = int(post_id)
+                row_id, key = post_id, f"{imin}:{post_id}"
+            else:
+                # Titles without a post number (from text logs) get negative ids and sort after all others
+                post_id = None
+                row_id = min(0, cursor.execute("SELECT MIN(id) FROM titles").fetchone()[0] or 0) - 1
+                key = f"{imin}:title:{title}"
+            cursor.execute(
+                "INSERT OR IGNORE INTO titles (id, record_key, imin, post_id, title, url) VALUES (?, ?, ?, ?, ?, ?)",
+                (row_id, key, imin, post_id, title, record.get("url")),
+            )
+            if cursor.rowcount:
+                batch.append((row_id, title_grams(title)))
+            if len(batch) >= batch_size:
+                added += self._flush(cursor, batch)
+        added += self._flush(cursor, batch)
+        return added
+
+    def _flush(self, cursor, batch):
+        cursor.executemany("INSERT INTO title_grams (rowid, grams) VALUES (?, ?)", batch)
+        self.connection.commit()
+        count = len(batch)
+        batch.clear()
+        return count
+
+    def search(self, query, imins=None, limit=20):
+        """Returns up to `limit` matching records as dicts, newest post first."""
+        expression, substrings = parse_query(query)
+        conditions, params = [], []
+        if expression:
+            # FTS5 hands matches over in rowid order, so the LIMIT stops the scan early
+            source, order = "title_grams g JOIN titles t ON t.id = g.rowid", "g.rowid"
+            conditions.append("title_grams MATCH ?")
+            params.append(expression)
+        else:
+            source, order = "titles t", "t.id"
+        for substring in substrings:
+            conditions.append("instr(lower(t.title), ?) > 0")
+            params.append(substring)
+        if imins:
+            conditions.append(f"t.imin IN ({', '.join('?' * len(imins))})")
+            params.extend(str(imin) for imin in imins)
+        where = " AND ".join(conditions) or "1"
+        rows = self.connection.execute(
+            f"SELECT t.imin, t.post_id, t.title, t.url FROM {source} WHERE {where} ORDER BY {order} DESC LIMIT ?",
+            params + [limit],
+        )
+        return [{"imin": imin, "post_id": post_id, "title": title, "url": url} for imin, post_id, title, url in rows]
+
+    def count(self):
+        return self.connection.execute("SELECT COUNT(*) FROM titles").fetchone()[0]
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+def read_records(path):
+    """
+    Yields records from a scraper output file: {imin}_log.jsonl or .csv (full records), or
+    {imin}_log.txt (titles only; the imin comes from the file name).
+    """
+    if path.endswith(".jsonl"):
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield json.loads(line)
+    elif path.endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as file:
+            yield from csv.DictReader(file)
+    else:
+        imin = os.path.basename(path).split("_log")[0]
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    yield {"imin": imin, "title": line.strip()}
+
+def read_seen_index(path):
+    """Yields the records stored in an imin_index.SeenPostIndex database."""
+    connection = sqlite3.connect(path)
+    try:
+        for imin, post_id, title, url in connection.execute("SELECT imin, post_id, title, url FROM posts"):
+            yield {"imin": imin, "post_id": post_id, "title": title, "url": url}
+    finally:
+        connection.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search scraped post titles.")
+    parser.add_argument("--index", default=DEFAULT_SEARCH_PATH, help=f"search database (default {DEFAULT_SEARCH_PATH})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    ingest = commands.add_parser("ingest", help="add scraper output files to the index")
+    ingest.add_argument("files", nargs="*", help="{imin}_log.jsonl, .csv or .txt files")
+    ingest.add_argument("--from-index", help="also add every post stored in a SeenPostIndex database")
+    search = commands.add_parser("query", help="search the index")
+    search.add_argument("query", help='terms, word* prefixes and "exact phrases"')
+    search.add_argument("--imin", action="append", help="only this imin (repeatable)")
+    search.add_argument("--limit", type=int, default=20)
+    search.add_argument("--json", action="store_true", help="print JSON lines")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    index = TitleSearchIndex(args.index)
+    try:
+        if args.command == "ingest":
+            start = time.perf_counter()
+            added = 0
+            for path in args.files:
+                added += index.add_records(read_records(path))
+            if args.from_index:
+                added += index.add_records(read_seen_index(args.from_index))
+            logging.info(f"Added {added} titles in {time.perf_counter() - start:.1f}s; {index.count()} indexed.")
+        else:
+            start = time.perf_counter()
+            results = index.search(args.query, args.imin, args.limit)
+            elapsed = time.perf_counter() - start
+            for record in results:
+                print(json.dumps(record, ensure_ascii=False) if args.json
+                      else f"{record['imin']}\t{record['post_id']}\t{record['title']}")
+            logging.info(f"{len(results)} results in {elapsed * 1000:.1f}ms.")
+    finally:
+        index.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
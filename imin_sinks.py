@@ -0,0 +1,83 @@
+import csv
+import json
+import os
+
+# Fields written by the structured sinks, in column order
+RECORD_FIELDS = ["imin", "page", "post_id", "title", "url"]
+
+class Sink:
+    """
+    Base class for streaming record writers. Every record is flushed as soon as it is
+    written, so a crashed or interrupted run still leaves everything written so far.
+    """
+
+    extension = None
+    newline = None
+
+    def __init__(self, path, append=False):
+        self.path = path
+        # Remember whether there is earlier output to continue after
+        self.has_content = append and os.path.exists(path) and os.path.getsize(path) > 0
+        self.file = open(path, "a" if append else "w", encoding="utf-8", newline=self.newline)
+
+    def write(self, record):
+        raise NotImplementedError
+
+    def close(self):
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class TextSink(Sink):
+    """Writes one title per line with no blank lines, the original {imin}_log.txt format."""
+
+    extension = "txt"
+
+    def write(self, record):
+        # The separator goes before each title so the file never ends with a blank line
+        self.file.write(("\n" if self.has_content else "") + record["title"])
+        self.has_content = True
+        self.file.flush()
+
+class JsonlSink(Sink):
+    """Writes one JSON object per line."""
+
+    extension = "jsonl"
+
+    def write(self, record):
+        self.file.write(json.dumps({field: record.get(field) for field in RECORD_FIELDS}, ensure_ascii=False) + "\n")
+        self.file.flush()
+
+class CsvSink(Sink):
+    """Writes a CSV file with a header row (skipped when appending to an existing file)."""
+
+    extension = "csv"
+    newline = ""  # The csv module writes its own line endings
+
+    def __init__(self, path, append=False):
+        super().__init__(path, append)
+        self.writer = csv.DictWriter(self.file, fieldnames=RECORD_FIELDS, extrasaction="ignore")
+        if not self.has_content:
+            self.writer.writeheader()
+
+    def write(self, record):
+        self.writer.writerow(record)
+        self.file.flush()
+
+SINKS = {
+    "text": TextSink,
+    "jsonl": JsonlSink,
+    "csv": CsvSink,
+}
+
+def open_sink(output_format, path, append=False):
+    """Opens the sink registered for output_format ("text", "jsonl" or "csv") at path."""
+    try:
+        sink_class = SINKS[output_format]
+    except KeyError:
+        raise ValueError(f"Unknown output format '{output_format}'. Available: {', '.join(SINKS)}") from None
+    return sink_class(path, append=append)
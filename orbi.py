@@ -0,0 +1,424 @@
+"""
+One entry point for the Orbi tools, usable without a terminal:
+
+    python orbi.py scrape-imin 12345 67890 --incremental --format jsonl
+    python orbi.py scrape-batch watchlist.txt --incremental
+    python orbi.py search-titles '국어 질문*' --imin 12345
+    python orbi.py download-images --minutes 30
+    python orbi.py list-posts --json
+    python orbi.py delete-posts 00071234567 00071234568 --dry-run
+    python orbi.py attendance
+    python orbi.py daemon
+
+Option defaults come from, in order: the command line, ORBI_<OPTION> environment variables
+(e.g. ORBI_MAX_RATE=2), then the command's section of the config file (orbi.json, or --config).
+--metrics-port serves request, page load, wait and parse timings for Prometheus while it runs.
+Credentials are read from ORBI_USERNAME / ORBI_PASSWORD and only prompted for if missing.
+
+The daemon runs the config file's "jobs" in one process, sharing one HTTP cache and
+connection pool between them. Each job is a command line plus a schedule:
+
+    {"jobs": [
+        {"args": ["scrape-imin", "12345", "--incremental"], "every": 3600},
+        {"args": ["attendance"], "at": "23:58"}
+    ]}
+"""
+import argparse
+import importlib.util
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+from imin_batch import DEFAULT_PROGRESS_PATH, read_imin_list, scrape_imin_batch
+from imin_parser import PARSERS
+from imin_scraper import scrape_imin_titles
+from imin_search import DEFAULT_SEARCH_PATH, TitleSearchIndex, read_records
+from imin_sinks import SINKS
+from orbi_archive import DEFAULT_ARCHIVE_DIR
+from orbi_cache import HttpCache
+from orbi_http import make_session
+from orbi_metrics import METRICS, serve_metrics
+from orbi_session import authenticated_session, ensure_logged_in, prompt_credentials
+
+DEFAULT_CONFIG_PATH = "orbi.json"
+ENV_PREFIX = "ORBI_"
+ATTENDANCE_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Orbi_attendance .py")
+
+# Values of boolean environment variables and config entries that mean "on"
+TRUE_VALUES = {"1", "true", "yes", "on"}
+
+def credentials():
+    """Returns (username, password) from ORBI_USERNAME / ORBI_PASSWORD, or the prompt if they are not set."""
+    username = os.environ.get(f"{ENV_PREFIX}USERNAME")
+    password = os.environ.get(f"{ENV_PREFIX}PASSWORD")
+    if username and password:
+        return username, password
+    return prompt_credentials
+
+def username_password():
+    """Returns (username, password) from the environment, or (None, None) so the tool prompts when it needs to."""
+    found = credentials()
+    return (None, None) if callable(found) else found
+
+def load_attendance():
+    """Imports 'Orbi_attendance .py', whose name is not a valid module name."""
+    spec = importlib.util.spec_from_file_location("orbi_attendance", ATTENDANCE_SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+class Context:
+    """Resources shared by every command run in this process, created on first use."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cache = None
+        self._session = None
+
+    @property
+    def session(self):
+        """A pooled session backed by the on-disk HTTP cache."""
+        with self._lock:
+            if self._session is None:
+                self._cache = HttpCache()
+                self._session = make_session(pool_size=16, cache=self._cache)
+            return self._session
+
+    def close(self):
+        with self._lock:
+            if self._session is not None:
+                self._session.close()
+                logging.info(self._cache.summary())
+                self._cache.close()
+                self._session = self._cache = None
+
+def scrape_imin(args, context):
+    for imin_number in args.imin:
+        scrape_imin_titles(
+            imin_number,
+            concurrent=not args.sequential,
+            window=args.window,
+            max_rate=args.max_rate or None,
+            parser=args.parser,
+            incremental=args.incremental,
+            output_format=args.format,
+            session=context.session,
+            search_index_path=args.search_index,
+        )
+
+def scrape_batch(args, context):
+    scrape_imin_batch(
+        read_imin_list(args.imin_file),
+        window=args.window,
+        max_rate=args.max_rate or None,
+        burst=args.burst,
+        parser=args.parser,
+        incremental=args.incremental,
+        output_format=args.format,
+        session=context.session,
+        progress_path=args.progress,
+        search_index_path=args.search_index,
+        restart=args.restart,
+    )
+
+def search_titles(args, context):
+    index = TitleSearchIndex(args.search_index)
+    try:
+        for path in args.ingest or ():
+            logging.info(f"{index.add_records(read_records(path))} titles added from {path}")
+        if args.query is not None:
+            for record in index.search(args.query, args.imin, args.limit):
+                print(json.dumps(record, ensure_ascii=False) if args.json
+                      else f"{record['imin']}\t{record['post_id']}\t{record['title']}")
+    finally:
+        index.close()
+
+def download_images(args, context):
+    from orbi_image_downloader import run_crawl
+
+    run_crawl(args.minutes * 60, use_browser=args.browser, session=context.session,
+              near_duplicates=args.near_duplicates, archive_dir=args.archive)
+
+def similar_images(args, context):
+    from orbi_image_downloader import IMAGE_DOWNLOAD_DIR
+    from orbi_image_store import ImageStore
+    from orbi_phash import index_store, query
+
+    if args.query:
+        for distance, digest, names in query(IMAGE_DOWNLOAD_DIR, args.query, args.max_distance):
+            print(f"{distance}\t{digest}\t{', '.join(names)}")
+        return
+    store = ImageStore(IMAGE_DOWNLOAD_DIR)
+    try:
+        index_store(store, args.max_distance, args.collapse, args.workers)
+    finally:
+        store.close()
+
+def logged_in_session():
+    """Returns a logged-in requests.Session, logging in through a browser first if there is no saved session."""
+    session = authenticated_session()
+    if session:
+        return session
+
+    from orbi_driver import make_driver
+
+    driver = make_driver("interactive")
+    try:
+        if not ensure_logged_in(driver, credentials()):
+            return None
+    finally:
+        driver.quit()
+    return authenticated_session()
+
+def list_posts(args, context):
+    from orbi_title_clicker import extract_posts_http
+
+    session = logged_in_session()
+    if not session:
+        logging.error("Login failed.")
+        return 1
+    try:
+        posts = extract_posts_http(session, workers=args.workers)
+    finally:
+        session.close()
+
+    for post in posts:
+        print(json.dumps(post, ensure_ascii=False) if args.json else f"{post['href']}\t{post['title']}")
+
+def delete_posts(args, context):
+    from orbi_title_clicker import DEFAULT_DELETE_REPORT, delete_posts as delete_batch
+
+    if not args.dry_run and not args.yes:
+        logging.error("Refusing to delete without --yes (or use --dry-run).")
+        return 1
+    post_ids = list(args.post)
+    if args.from_file:
+        with open(args.from_file, encoding="utf-8") as file:
+            post_ids += [line.strip() for line in file if line.strip()]
+    posts = [{"title": "", "href": post_id} for post_id in post_ids]
+    delete_batch(posts, args.workers, args.max_rate, args.dry_run, args.report or DEFAULT_DELETE_REPORT,
+                 credentials())
+
+def attendance(args, context):
+    load_attendance().main(credentials())
+
+def lottery(args, context):
+    from orbi_lottery import click_lottery_balloon, login_to_orbi
+
+    username, password = username_password()
+    driver = login_to_orbi(username, password, profile=args.profile)
+    if not driver:
+        return 1
+    try:
+        click_lottery_balloon(driver, args.clicks)
+    finally:
+        driver.quit()
+
+def comment(args, context):
+    from orbi_commenter import login_to_orbi_and_comment
+
+    username, password = username_password()
+    login_to_orbi_and_comment(username, password, args.article, args.text, args.count, profile=args.profile,
+                              interval=args.interval)
+
+def next_run(job, now):
+    """Returns when a job should next run: every N seconds, or daily at HH:MM[:SS] local time."""
+    if "at" in job:
+        at = datetime.strptime(job["at"], "%H:%M:%S" if job["at"].count(":") == 2 else "%H:%M").time()
+        run_at = datetime.combine(datetime.fromtimestamp(now).date(), at)
+        if run_at.timestamp() <= now:
+            run_at += timedelta(days=1)
+        return run_at.timestamp()
+    return now + float(job["every"])
+
+def daemon(args, context):
+    jobs = args.config_data.get("jobs") or []
+    if not jobs:
+        logging.error(f"No jobs configured in {args.config}.")
+        return 1
+
+    stop = threading.Event()
+
+    def run_job(job):
+        name = " ".join(job["args"])
+        # Interval jobs run once at startup; daily ones wait for their time
+        run_at = time.time() if "every" in job and job.get("run_at_start", True) else next_run(job, time.time())
+        while not stop.wait(max(0.0, run_at - time.time())):
+            logging.info(f"Starting job: {name}")
+            start = time.monotonic()
+            try:
+                run(job["args"], context, args.config_data)
+            except Exception as e:
+                logging.error(f"Job {name} failed: {e}")
+            logging.info(f"Job {name} finished in {time.monotonic() - start:.1f}s.")
+            run_at = next_run(job, time.time())
+            logging.info(f"Next run of {name} at {datetime.fromtimestamp(run_at):%Y-%m-%d %H:%M:%S}.")
+
+    threads = [threading.Thread(target=run_job, args=(job,), name=f"job-{i}", daemon=True) for i, job in enumerate(jobs)]
+    for thread in threads:
+        thread.start()
+    logging.info(f"Daemon running {len(jobs)} jobs. Press Ctrl+C to stop.")
+    try:
+        while any(thread.is_alive() for thread in threads):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        logging.info("Stopping; jobs that are running will be abandoned.")
+        stop.set()
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="orbi", description="Orbi tools.")
+    parser.add_argument("--config", default=os.environ.get(f"{ENV_PREFIX}CONFIG", DEFAULT_CONFIG_PATH),
+                        help=f"JSON config file (default {DEFAULT_CONFIG_PATH})")
+    parser.add_argument("--verbose", "-v", action="store_true", help="log debug messages")
+    parser.add_argument("--metrics-port", type=int, default=os.environ.get(f"{ENV_PREFIX}METRICS_PORT"),
+                        help="serve Prometheus metrics on this local port (/metrics and /metrics.json)")
+    parser.add_argument("--metrics-json", default=os.environ.get(f"{ENV_PREFIX}METRICS_JSON"),
+                        help="write a JSON snapshot of the metrics to this file on exit")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    command = commands.add_parser("scrape-imin", help="scrape every post title of one or more imins")
+    command.add_argument("imin", nargs="+", help="imin numbers")
+    command.add_argument("--sequential", action="store_true", help="fetch one page at a time")
+    command.add_argument("--window", type=int, default=8, help="pages fetched ahead (default 8)")
+    command.add_argument("--max-rate", type=float, default=5.0, help="requests per second, 0 for no cap (default 5)")
+    command.add_argument("--parser", choices=sorted(PARSERS), help="HTML parser backend")
+    command.add_argument("--incremental", action="store_true", help="stop at posts scraped in earlier runs")
+    command.add_argument("--format", choices=sorted(SINKS), default="text", help="output format (default text)")
+    command.add_argument("--search-index", help="also add the titles to this search database (see search-titles)")
+    command.set_defaults(handler=scrape_imin)
+
+    command = commands.add_parser("scrape-batch", help="scrape every imin in a list file as one fair, rate-limited batch")
+    command.add_argument("imin_file", help="file with one imin number per line")
+    command.add_argument("--window", type=int, default=8, help="pages in flight across all imins (default 8)")
+    command.add_argument("--max-rate", type=float, default=5.0,
+                         help="requests per second for the whole batch, 0 for no cap (default 5)")
+    command.add_argument("--burst", type=int, default=4, help="requests allowed at once after an idle spell (default 4)")
+    command.add_argument("--parser", choices=sorted(PARSERS), help="HTML parser backend")
+    command.add_argument("--incremental", action="store_true", help="stop at posts scraped in earlier runs")
+    command.add_argument("--format", choices=sorted(SINKS), default="text", help="output format (default text)")
+    command.add_argument("--search-index", help="also add the titles to this search database (see search-titles)")
+    command.add_argument("--progress", default=DEFAULT_PROGRESS_PATH,
+                         help=f"where per-imin progress is saved for resuming (default {DEFAULT_PROGRESS_PATH})")
+    command.add_argument("--restart", action="store_true", help="ignore saved progress and start the batch over")
+    command.set_defaults(handler=scrape_batch)
+
+    command = commands.add_parser("search-titles", help="search scraped titles, optionally adding scraper output first")
+    command.add_argument("query", nargs="?", help='terms, word* prefixes and "exact phrases"')
+    command.add_argument("--imin", action="append", help="only this imin (repeatable)")
+    command.add_argument("--limit", type=int, default=20)
+    command.add_argument("--ingest", action="append", metavar="FILE", help="add an {imin}_log file to the index first")
+    command.add_argument("--search-index", default=DEFAULT_SEARCH_PATH,
+                         help=f"search database (default {DEFAULT_SEARCH_PATH})")
+    command.add_argument("--json", action="store_true", help="print JSON lines")
+    command.set_defaults(handler=search_titles)
+
+    command = commands.add_parser("download-images", help="crawl new articles and download their images")
+    command.add_argument("--minutes", type=float, default=10, help="how long to crawl (default 10)")
+    command.add_argument("--browser", action="store_true", help="crawl with Chrome instead of plain HTTP")
+    command.add_argument("--near-duplicates", choices=["flag", "collapse"],
+                         help="hash the new images afterwards and flag or collapse near-duplicates (needs Pillow)")
+    command.add_argument("--archive", nargs="?", const=DEFAULT_ARCHIVE_DIR, metavar="DIR",
+                         help=f"keep every article's HTML in a compressed archive (default dir {DEFAULT_ARCHIVE_DIR})")
+    command.set_defaults(handler=download_images)
+
+    command = commands.add_parser("similar-images", help="index the image store for near-duplicates, or query it")
+    command.add_argument("--query", metavar="IMAGE", help="list stored images similar to this file instead")
+    command.add_argument("--max-distance", type=int, default=6, help="largest pHash distance counted as similar (default 6)")
+    command.add_argument("--collapse", action="store_true", help="relink near-duplicates to the original and delete the copy")
+    command.add_argument("--workers", type=int, help="hashing processes (default: one per CPU)")
+    command.set_defaults(handler=similar_images)
+
+    command = commands.add_parser("list-posts", help="list my posts")
+    command.add_argument("--workers", type=int, default=4, help="pages fetched in parallel (default 4)")
+    command.add_argument("--json", action="store_true", help="print JSON lines instead of tab-separated text")
+    command.set_defaults(handler=list_posts)
+
+    command = commands.add_parser("delete-posts", help="delete my posts by post number")
+    command.add_argument("post", nargs="*", help="post numbers")
+    command.add_argument("--from-file", help="file with one post number per line")
+    command.add_argument("--workers", type=int, default=2, help="browsers deleting in parallel (default 2)")
+    command.add_argument("--max-rate", type=float, default=0.5, help="deletions started per second (default 0.5)")
+    command.add_argument("--report", help="JSON Lines report to write and resume from")
+    command.add_argument("--dry-run", action="store_true", help="only log what would be deleted")
+    command.add_argument("--yes", action="store_true", help="delete without asking")
+    command.set_defaults(handler=delete_posts)
+
+    command = commands.add_parser("attendance", help="check in at midnight")
+    command.set_defaults(handler=attendance)
+
+    command = commands.add_parser("lottery", help="click the lottery balloon")
+    command.add_argument("--clicks", type=int, default=1, help="number of clicks (default 1)")
+    command.add_argument("--profile", default="visible", help="browser profile (default visible; headless for unattended runs)")
+    command.set_defaults(handler=lottery)
+
+    command = commands.add_parser("comment", help="post comments on an article")
+    command.add_argument("article", help="article number")
+    command.add_argument("--text", required=True, help="comment text")
+    command.add_argument("--count", type=int, default=1, help="number of comments (default 1)")
+    command.add_argument("--interval", type=float, default=2, help="seconds between comments (default 2)")
+    command.add_argument("--profile", default="visible", help="browser profile (default visible; headless for unattended runs)")
+    command.set_defaults(handler=comment)
+
+    command = commands.add_parser("daemon", help="run the config file's scheduled jobs in one process")
+    command.set_defaults(handler=daemon)
+    return parser, commands.choices
+
+def apply_defaults(commands, config):
+    """Overrides each subcommand's option defaults from ORBI_<OPTION> variables and the config file."""
+    for name, command in commands.items():
+        section = config.get(name, {})
+        defaults = {}
+        for action in command._actions:
+            if not action.option_strings or action.dest == "help":
+                continue
+            env_value = os.environ.get(ENV_PREFIX + action.dest.upper())
+            value = env_value if env_value is not None else section.get(action.dest, section.get(action.dest.replace("_", "-")))
+            if value is None:
+                continue
+            if action.nargs == 0:  # A flag such as --incremental
+                value = str(value).lower() in TRUE_VALUES
+            # String defaults go through the option's type, like command-line values
+            defaults[action.dest] = value
+        command.set_defaults(**defaults)
+
+def load_config(path):
+    try:
+        with open(path, encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {}
+
+def run(argv, context, config=None):
+    """Parses a command line (without the program name) and runs it. Returns the exit status."""
+    parser, commands = build_parser()
+    if config is None:
+        config = load_config(parser.parse_known_args(argv)[0].config)
+    apply_defaults(commands, config)
+    args = parser.parse_args(argv)
+    args.config_data = config
+    return args.handler(args, context) or 0
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    logging.basicConfig(
+        level=logging.DEBUG if "-v" in argv or "--verbose" in argv else logging.INFO,
+        format="%(asctime)s - %(threadName)s - %(levelname)s - %(message)s",
+        force=True,
+    )
+    options = build_parser()[0].parse_known_args(argv)[0]
+    if options.metrics_port:
+        serve_metrics(options.metrics_port)
+    context = Context()
+    try:
+        return run(argv, context)
+    finally:
+        context.close()
+        if options.metrics_json:
+            METRICS.write_json(options.metrics_json)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+"""
+Compressed archive of crawled article pages, so old articles can be re-analyzed without crawling them again.
+
+Each article's HTML is stored with its metadata as one record, appended to segment files
+(article_archive/articles-00000.gz, ...). Every record is compressed on its own as a separate
+gzip member (or zstd frame), so a segment is still a valid .gz / .zst file: zcat streams
+every record in it, much like a WARC file. A SQLite index maps each post id to its segment,
+offset and length, so reading one article back is one seek into a memory-mapped segment and one
+decompress. Segments rotate once they pass max_segment_bytes.
+
+    python orbi_archive.py get 71234567 > article.html
+    python orbi_archive.py stats
+    python orbi_archive.py dump  # metadata of every record, as JSON lines
+
+zstd compresses better and faster than gzip; it is used if the zstandard package is
+installed (pip install zstandard), otherwise gzip. Both kinds of segment can be read as long as
+the package is installed for zstd.
+"""
+import argparse
+import gzip
+import json
+import logging
+import mmap
+import os
+import sqlite3
+import sys
+import threading
+import time
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstandard is optional; gzip is used without it
+    zstandard = None
+
+DEFAULT_ARCHIVE_DIR = "article_archive"
+DEFAULT_MAX_SEGMENT_BYTES = 128 * 1024 * 1024
+
+CODEC_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+
+def default_codec():
+    return "zstd" if zstandard else "gzip"
+
+def compress(codec, data):
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=9).compress(data)
+    return gzip.compress(data, compresslevel=6, mtime=0)
+
+def decompress(codec, data):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Reading zstd segments needs zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    # wbits=31 reads one gzip member, without gzip.decompress's search for further members
+    return zlib.decompress(data, 31)
+
+def encode_record(metadata, body):
+    """A record is its metadata as one JSON line followed by the raw page bytes."""
+    return json.dumps(metadata, ensure_ascii=False).encode("utf-8") + b"\n" + body
+
+def decode_record(data):
+    header, _, body = data.partition(b"\n")
+    return json.loads(header), body
+
+class ArticleArchive:
+    """
+    Append-only article archive with a post id index. Archiving a post again replaces its
+    index entry, so reads return the newest copy; the older bytes stay in their segment.
+    """
+
+    def __init__(self, directory=DEFAULT_ARCHIVE_DIR, max_segment_bytes=DEFAULT_MAX_SEGMENT_BYTES, codec=None):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.codec = codec or default_codec()
+        self._lock = threading.Lock()
+        self._maps = {}
+
+        os.makedirs(directory, exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS segments (number INTEGER PRIMARY KEY, name TEXT NOT NULL, codec TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS records ("
+                "post_id INTEGER PRIMARY KEY, segment INTEGER NOT NULL, offset INTEGER NOT NULL, length INTEGER NOT NULL)"
+            )
+        self._segments = {
+            number: (name, codec) for number, name, codec in self.connection.execute("SELECT * FROM segments")
+        }
+        self._file = None
+        self._open_last_segment()
+
+    def _open_last_segment(self):
+        if not self._segments:
+            self._start_segment(0)
+            return
+        number = max(self._segments)
+        name, codec = self._segments[number]
+        if codec != self.codec:
+            # Never mix codecs within a segment
+            self._start_segment(number + 1)
+            return
+        # Drop a record that was written but never indexed, e.g. after a crash mid-append
+        end = self.connection.execute(
+            "SELECT MAX(offset + length) FROM records WHERE segment = ?", (number,)
+        ).fetchone()[0] or 0
+        path = os.path.join(self.directory, name)
+        if os.path.exists(path) and os.path.getsize(path) > end:
+            logging.warning(f"Truncating {os.path.getsize(path) - end} unindexed bytes from {name}")
+            os.truncate(path, end)
+        self._number = number
+        self._file = open(path, "ab")
+
+    def _start_segment(self, number):
+        if self._file:
+            self._file.close()
+        name = f"articles-{number:05d}{CODEC_EXTENSIONS[self.codec]}"
+        with self.connection:
+            self.connection.execute("INSERT INTO segments (number, name, codec) VALUES (?, ?, ?)", (number, name, self.codec))
+        self._segments[number] = (name, self.codec)
+        self._number = number
+        self._file = open(os.path.join(self.directory, name), "ab")
+
+    def add(self, post_id, url, body, **metadata):
+        """
+        Archives one article page. body is the page's raw bytes (str is stored as UTF-8);
+        metadata (e.g. status, content_type) is stored alongside the url and the time archived.
+        """
+        if isinstance(body, str):
+            body = body.encode("utf-8")
+        record = encode_record(
+            {"post_id": post_id, "url": url, "archived_at": time.time(), "length": len(body), **metadata}, body
+        )
+        data = compress(self.codec, record)
+        with self._lock:
+            if self._file.tell() and self._file.tell() + len(data) > self.max_segment_bytes:
+                self._start_segment(self._number + 1)
+            offset = self._file.tell()
+            self._file.write(data)
+            # The bytes must be in the file before the index points at them
+            self._file.flush()
+            with self.connection:
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO records (post_id, segment, offset, length) VALUES (?, ?, ?, ?)",
+                    (post_id, self._number, offset, len(data)),
+                )
+
+    def __contains__(self, post_id):
+        with self._lock:
+            return self.connection.execute("SELECT 1 FROM records WHERE post_id = ?", (post_id,)).fetchone() is not None
+
+    def _read(self, segment, offset, length):
+        name, codec = self._segments[segment]
+        view = self._maps.get(segment)
+        if view is None or offset + length > len(view):
+            # First read of this segment, or it has grown since it was mapped
+            if view is not None:
+                view.close()
+            with open(os.path.join(self.directory, name), "rb") as file:
+                view = self._maps[segment] = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return decode_record(decompress(codec, view[offset:offset + length]))
+
+    def get(self, post_id):
+        """Returns (metadata, body bytes) for an archived post, or None."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT segment, offset, length FROM records WHERE post_id = ?", (post_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            return self._read(*row)
+
+    def __iter__(self):
+        """Streams (metadata, body) for every archived post, in the order they were archived."""
+        with self._lock:
+            rows = self.connection.execute("SELECT segment, offset, length FROM records ORDER BY segment, offset").fetchall()
+        for segment, offset, length in rows:
+            with self._lock:
+                record = self._read(segment, offset, length)
+            yield record
+
+    def stats(self):
+        with self._lock:
+            records, stored = self.connection.execute("SELECT COUNT(*), IFNULL(SUM(length), 0) FROM records").fetchone()
+        size = sum(
+            os.path.getsize(os.path.join(self.directory, name))
+            for name, _ in self._segments.values()
+            if os.path.exists(os.path.join(self.directory, name))
+        )
+        return {"records": records, "segments": len(self._segments), "bytes": size, "indexed_bytes": stored}
+
+    def close(self):
+        with self._lock:
+            for view in self._maps.values():
+                view.close()
+            self._maps.clear()
+            self._file.close()
+            self.connection.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Read the article archive.")
+    parser.add_argument("--archive", default=DEFAULT_ARCHIVE_DIR, help=f"archive directory (default {DEFAULT_ARCHIVE_DIR})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    get = commands.add_parser("get", help="write one archived article's HTML to stdout")
+    get.add_argument("post_id", type=int)
+    commands.add_parser("stats", help="print record and size counts")
+    commands.add_parser("dump", help="print every record's metadata as JSON lines")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    archive = ArticleArchive(args.archive)
+    try:
+        if args.command == "get":
+            record = archive.get(args.post_id)
+            if record is None:
+                logging.error(f"Post {args.post_id} is not archived.")
+                return 1
+            sys.stdout.buffer.write(record[1])
+        elif args.command == "stats":
+            print(json.dumps(archive.stats()))
+        else:
+            for metadata, _ in archive:
+                print(json.dumps(metadata, ensure_ascii=False))
+    finally:
+        archive.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
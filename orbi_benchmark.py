@@ -0,0 +1,175 @@
+"""
+Offline benchmarks for the Orbi tools, run against orbi_fixture_server instead of orbi.kr.
+
+    python orbi_benchmark.py --latency 0.02 --output results.json
+    python orbi_benchmark.py --latency 0.02 --compare results.json
+
+Measures pages/sec for scrape_imin_titles (sequential and concurrent) and for a batch of
+imins (scrape_imin_batch), articles/sec and images/sec for the image crawl, and the
+end-to-end time of listing my posts (over HTTP, and in Chrome with --browser). Each benchmark runs --repeat times in a fresh working
+directory and the median is reported. Results are saved as JSON; --compare prints the
+change against an earlier results file.
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from orbi_fixture_server import FixtureSite, start_server
+from orbi_metrics import METRICS
+
+def measure(site, run, repeat):
+    """Calls run() `repeat` times, each in a new empty directory. Returns [(seconds, requests, result)]."""
+    runs = []
+    for _ in range(repeat):
+        workdir = tempfile.mkdtemp(prefix="orbi-bench-")
+        previous_dir = os.getcwd()
+        os.chdir(workdir)
+        try:
+            requests_before = site.requests
+            start = time.perf_counter()
+            # The tools print progress for every page; keep the benchmark output readable
+            with contextlib.redirect_stdout(io.StringIO()):
+                result = run()
+            runs.append((time.perf_counter() - start, site.requests - requests_before, result))
+        finally:
+            os.chdir(previous_dir)
+    return runs
+
+def summarize(runs, **rates):
+    """
+    Reduces runs to the median time plus one median rate per keyword, where each keyword
+    maps to a function (seconds, requests, result) -> items processed.
+    """
+    summary = {"seconds": statistics.median(seconds for seconds, _, _ in runs), "runs": len(runs)}
+    for name, count in rates.items():
+        summary[name] = statistics.median(count(*run) / run[0] for run in runs)
+    return summary
+
+def run_benchmarks(site, args):
+    # Imported only now, so they pick up ORBI_BASE_URL
+    from imin_batch import scrape_imin_batch
+    from imin_scraper import scrape_imin_titles
+    from orbi_http import make_session
+    from orbi_image_downloader import run_crawl
+    from orbi_title_clicker import extract_posts, extract_posts_http
+
+    results = {}
+
+    for name, concurrent in [("scrape_imin_sequential", False), ("scrape_imin_concurrent", True)]:
+        runs = measure(site, lambda: scrape_imin_titles("1234", concurrent=concurrent, max_rate=None), args.repeat)
+        results[name] = summarize(runs, pages_per_sec=lambda seconds, requests, result: requests)
+
+    imins = [str(1000 + i) for i in range(args.batch_imins)]
+    runs = measure(site, lambda: scrape_imin_batch(imins, max_rate=None), args.repeat)
+    results["scrape_imin_batch"] = summarize(runs, pages_per_sec=lambda seconds, requests, result: requests)
+
+    def crawl():
+        session = make_session()
+        try:
+            # A run time this short makes the crawl stop after its first pass over the list
+            return run_crawl(0.01, session=session)
+        finally:
+            session.close()
+
+    runs = measure(site, crawl, args.repeat)
+    results["image_crawl"] = summarize(
+        runs,
+        articles_per_sec=lambda seconds, requests, result: result["articles"],
+        images_per_sec=lambda seconds, requests, result: result["images"],
+    )
+
+    def list_posts_http():
+        session = make_session()
+        try:
+            return extract_posts_http(session, workers=args.workers)
+        finally:
+            session.close()
+
+    runs = measure(site, list_posts_http, args.repeat)
+    results["extract_posts_http"] = summarize(runs, posts_per_sec=lambda seconds, requests, result: len(result))
+
+    if args.browser:
+        from orbi_driver import make_driver
+
+        driver = make_driver("interactive")
+        try:
+            runs = measure(site, lambda: extract_posts(driver), args.repeat)
+        finally:
+            driver.quit()
+        results["extract_posts_browser"] = summarize(runs, posts_per_sec=lambda seconds, requests, result: len(result))
+
+    return results
+
+def compare(results, previous):
+    """Prints each rate next to the same rate in an earlier results file."""
+    for name, summary in results.items():
+        before = previous.get("results", {}).get(name)
+        if not before:
+            continue
+        for key, value in summary.items():
+            if key.endswith("_per_sec") and before.get(key):
+                change = (value / before[key] - 1) * 100
+                print(f"  {name}.{key}: {before[key]:.1f} -> {value:.1f} ({change:+.1f}%)")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Orbi tools against a local fixture server.")
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every request (default 0.02)")
+    parser.add_argument("--search-pages", type=int, default=20)
+    parser.add_argument("--list-pages", type=int, default=5)
+    parser.add_argument("--batch-imins", type=int, default=10, help="imins in the batch scraping benchmark")
+    parser.add_argument("--my-post-pages", type=int, default=10)
+    parser.add_argument("--posts-per-page", type=int, default=20)
+    parser.add_argument("--images-per-article", type=int, default=3)
+    parser.add_argument("--image-bytes", type=int, default=32 * 1024)
+    parser.add_argument("--fixtures", help="directory of recorded responses (see orbi_fixture_server)")
+    parser.add_argument("--workers", type=int, default=4, help="parallel page fetches when listing my posts")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--browser", action="store_true", help="also benchmark the Chrome-based extract_posts")
+    parser.add_argument("--output", default=f"benchmark-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s - %(levelname)s - %(message)s")
+    site = FixtureSite(args.search_pages, args.list_pages, args.my_post_pages, args.posts_per_page,
+                       args.images_per_article, args.image_bytes, args.latency, args.fixtures)
+    server = start_server(site)
+    os.environ["ORBI_BASE_URL"] = server.base_url
+    try:
+        results = run_benchmarks(site, args)
+    finally:
+        server.shutdown()
+
+    for name, summary in results.items():
+        rates = ", ".join(f"{value:.1f} {key.replace('_per_sec', '/sec')}"
+                          for key, value in summary.items() if key.endswith("_per_sec"))
+        print(f"{name}: {summary['seconds'] * 1000:.0f}ms, {rates}")
+
+    report = {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "results": results,
+        # Where the time went: request, parse, download and disk write timings over all runs
+        "metrics": METRICS.snapshot(),
+    }
+    with open(args.output, "w", encoding="utf-8") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            previous = json.load(file)
+        print(f"Compared with {args.compare} ({previous.get('timestamp')}):")
+        compare(results, previous)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
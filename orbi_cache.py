@@ -0,0 +1,281 @@
+import hashlib
+import io
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from requests.adapters import HTTPAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+DEFAULT_CACHE_DIR = ".orbi_cache"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# (URL regex, TTL in seconds) pairs, first match wins. None means the entry never
+# expires; 0 means it is revalidated with a conditional request on every use.
+DEFAULT_TTL_RULES = [
+    (r"\.(?:jpe?g|png|gif|webp|bmp|svg)(?:[?#]|$)", None),  # Image URLs never change
+    (r"^https?://[^/]*orbi\.kr/list(?:[/?#]|$)", 30),  # List pages expire after 30s
+]
+DEFAULT_TTL = 0
+
+# Response headers kept with each entry and replayed on cache hits
+STORED_HEADERS = ["Content-Type", "Content-Length", "ETag", "Last-Modified", "Content-Disposition"]
+
+class HttpCache:
+    """
+    On-disk HTTP response cache shared by every tool.
+
+    Bodies are stored as files under `directory` and metadata in an SQLite index next to
+    them. Stale entries are revalidated with If-None-Match / If-Modified-Since, and once the
+    stored bodies exceed max_bytes the least recently used entries are evicted.
+    Safe to share between threads.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES,
+                 ttl_rules=None, default_ttl=DEFAULT_TTL, max_entry_bytes=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes or max_bytes // 10
+        self.ttl_rules = [
+            (re.compile(pattern), ttl)
+            for pattern, ttl in (DEFAULT_TTL_RULES if ttl_rules is None else ttl_rules)
+        ]
+        self.default_ttl = default_ttl
+        self.counters = {
+            "hits": 0,  # Served from disk without touching the network
+            "revalidated": 0,  # Served from disk after a 304 Not Modified
+            "misses": 0,  # Fetched in full from the network
+            "stores": 0,
+            "evictions": 0,
+            "bytes_served": 0,  # Body bytes served from disk instead of the network
+            "bytes_fetched": 0,  # Body bytes downloaded on misses
+            "miss_seconds": 0.0,  # Time spent fetching misses, used to estimate time saved
+        }
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.join(directory, "bodies"), exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, "index.sqlite3"), check_same_thread=False)
+        self.connection.execute(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                headers TEXT NOT NULL,
+                stored_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self.connection.execute("CREATE INDEX IF NOT EXISTS entries_last_access ON entries (last_access)")
+        self.connection.commit()
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def ttl_for(self, url):
+        """Returns the TTL for url from the first matching rule, or the default TTL."""
+        for pattern, ttl in self.ttl_rules:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def _key(self, url):
+        return hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, "bodies", key[:2], key)
+
+    def lookup(self, url):
+        """
+        Returns (headers, body, fresh) for a cached url, or None. fresh is False when
+        the entry has outlived its TTL and must be revalidated before use.
+        """
+        key = self._key(url)
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT headers, stored_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self._body_path(key), "rb") as file:
+                body = file.read()
+        except OSError:
+            self.delete(url)  # The body file went missing; forget the entry
+            return None
+
+        ttl = self.ttl_for(url)
+        fresh = ttl is None or time.time() - row[1] < ttl
+        return json.loads(row[0]), body, fresh
+
+    def touch(self, url, refreshed=False):
+        """Marks an entry as just used; refreshed=True also restarts its TTL after a 304."""
+        now = time.time()
+        with self._lock, self.connection:
+            if refreshed:
+                self.connection.execute(
+                    "UPDATE entries SET last_access = ?, stored_at = ? WHERE key = ?", (now, now, self._key(url))
+                )
+            else:
+                self.connection.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, self._key(url)))
+
+    def store(self, url, headers, body):
+        """Stores a 200 response body with its headers, then evicts old entries if the cache is over size."""
+        if len(body) > self.max_entry_bytes:
+            return
+        key = self._key(url)
+        path = self._body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file and rename so readers never see a partial body
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(body)
+        os.replace(temp_path, path)
+
+        kept_headers = {name: headers[name] for name in STORED_HEADERS if name in headers}
+        now = time.time()
+        with self._lock, self.connection:
+            row = self.connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries (key, url, headers, stored_at, last_access, size) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, url, json.dumps(kept_headers), now, now, len(body)),
+            )
+            self.total_bytes += len(body) - (row[0] if row else 0)
+            self.counters["stores"] += 1
+        self.evict()
+
+    def delete(self, url):
+        key = self._key(url)
+        with self._lock, self.connection:
+            row = self.connection.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return
+            self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self.total_bytes -= row[0]
+        try:
+            os.remove(self._body_path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Removes least recently used entries until the stored bodies fit in max_bytes."""
+        while self.total_bytes > self.max_bytes:
+            with self._lock, self.connection:
+                rows = self.connection.execute(
+                    "SELECT key, size FROM entries ORDER BY last_access LIMIT 64"
+                ).fetchall()
+                if not rows:
+                    self.total_bytes = 0
+                    return
+                for key, size in rows:
+                    if self.total_bytes <= self.max_bytes:
+                        break
+                    self.connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    self.total_bytes -= size
+                    self.counters["evictions"] += 1
+                    try:
+                        os.remove(self._body_path(key))
+                    except OSError:
+                        pass
+
+    def count(self, **increments):
+        with self._lock:
+            for name, value in increments.items():
+                self.counters[name] += value
+
+    def stats(self):
+        """Returns the hit/miss counters plus the entry count, cache size and an estimate of time saved."""
+        with self._lock:
+            stats = dict(self.counters)
+            stats["entries"] = self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+        stats["size_bytes"] = self.total_bytes
+        requests_seen = stats["hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_ratio"] = (stats["hits"] + stats["revalidated"]) / requests_seen if requests_seen else 0.0
+        # A full hit saves roughly one average miss worth of latency
+        average_miss = stats["miss_seconds"] / stats["misses"] if stats["misses"] else 0.0
+        stats["estimated_seconds_saved"] = stats["hits"] * average_miss
+        return stats
+
+    def summary(self):
+        """Returns a one-line, human-readable summary of stats()."""
+        stats = self.stats()
+        return (
+            f"HTTP cache: {stats['hits']} hits, {stats['revalidated']} revalidated, {stats['misses']} misses "
+            f"({stats['hit_ratio']:.0%} hit ratio), {stats['bytes_served'] / 1024:.0f} KiB served from disk, "
+            f"~{stats['estimated_seconds_saved']:.1f}s saved, {stats['size_bytes'] / 1024:.0f} KiB cached"
+        )
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+class CachingAdapter(HTTPAdapter):
+    """
+    Transport adapter that answers GET requests from an HttpCache. Mount it on a
+    requests.Session (orbi_http.make_session does this when given a cache).
+    Responses served from disk have `from_cache = True`.
+    """
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def send(self, request, **kwargs):
+        # Range requests resume partial transfers and must always reach the server
+        if request.method != "GET" or "Range" in request.headers:
+            return super().send(request, **kwargs)
+
+        url = request.url
+        cached = self.cache.lookup(url)
+        if cached:
+            headers, body, fresh = cached
+            # A request sent with "Cache-Control: no-cache" always revalidates
+            if fresh and "no-cache" not in request.headers.get("Cache-Control", ""):
+                self.cache.touch(url)
+                self.cache.count(hits=1, bytes_served=len(body))
+                return self._cached_response(request, headers, body)
+
+            # Stale: ask the server whether our copy is still current
+            request = request.copy()
+            if "ETag" in headers:
+                request.headers["If-None-Match"] = headers["ETag"]
+            if "Last-Modified" in headers:
+                request.headers["If-Modified-Since"] = headers["Last-Modified"]
+
+        start = time.monotonic()
+        response = super().send(request, **kwargs)
+
+        if cached and response.status_code == 304:
+            response.close()
+            self.cache.touch(url, refreshed=True)
+            self.cache.count(revalidated=1, bytes_served=len(cached[1]))
+            return self._cached_response(request, cached[0], cached[1])
+
+        # With no TTL and nothing to revalidate against, a stored copy could never be used
+        reusable = self.cache.ttl_for(url) != 0 or "ETag" in response.headers or "Last-Modified" in response.headers
+        if response.status_code == 200 and reusable and "no-store" not in response.headers.get("Cache-Control", ""):
+            body = response.content  # Read the body now so it can be stored
+            self.cache.count(misses=1, bytes_fetched=len(body), miss_seconds=time.monotonic() - start)
+            self.cache.store(url, response.headers, body)
+        else:
+            self.cache.count(misses=1)
+        return response
+
+    def _cached_response(self, request, headers, body):
+        response = Response()
+        response.status_code = 200
+        response.reason = "OK"
+        response.headers = CaseInsensitiveDict(headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(body)
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.from_cache = True
+        return response
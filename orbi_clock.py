@@ -0,0 +1,145 @@
+import logging
+import time
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+import requests
+
+from orbi_http import SITE_URL, make_session
+
+# A small page on the main domain; only its Date header is used
+PROBE_URL = f"{SITE_URL}/robots.txt"
+
+class ServerClock:
+    """
+    Estimates the offset between the local clock and Orbi's from HTTP Date headers.
+
+    A Date header only has one-second resolution, but a response stamped with second S
+    was produced somewhere between sending the request (t0) and receiving it (t1), so
+    offset lies in [S - t1, S + 1 - t0). sync() intersects these windows over requests
+    timed around the server's second boundary, which narrows the offset down to about one
+    round trip. The same keep-alive connection is reused throughout, so it stays warm.
+    """
+
+    def __init__(self, session=None, url=PROBE_URL):
+        self.session = session or make_session(pool_size=1)
+        self.url = url
+        self.offset = 0.0
+        self.uncertainty = None
+        self.rtt = None
+
+    def sample(self):
+        """Makes one request and returns (t0, t1, server_second), or None if it failed."""
+        t0 = time.time()
+        try:
+            response = self.session.head(
+                self.url, headers={"Cache-Control": "no-cache"}, allow_redirects=False, timeout=5
+            )
+        except requests.RequestException as e:
+            logging.warning(f"Clock probe failed: {e}")
+            return None
+        t1 = time.time()
+        date = response.headers.get("Date")
+        if not date:
+            logging.warning("Clock probe response has no Date header.")
+            return None
+        return t0, t1, parsedate_to_datetime(date).timestamp()
+
+    def sync(self, samples=8, refinements=5):
+        """
+        Estimates the offset: `samples` requests spread over a second to find where the
+        server's second ticks over, then `refinements` requests aimed at the next ticks.
+        Returns the offset in seconds (server minus local).
+        """
+        low, high = float("-inf"), float("inf")
+        rtts = []
+
+        def add(result):
+            nonlocal low, high
+            if result is None:
+                return
+            t0, t1, server_second = result
+            rtts.append(t1 - t0)
+            sample_low, sample_high = server_second - t1, server_second + 1 - t0
+            if sample_low > high or sample_high < low:
+                # Inconsistent with earlier samples (e.g. the local clock was stepped); start over
+                low, high = sample_low, sample_high
+            else:
+                low, high = max(low, sample_low), min(high, sample_high)
+
+        for _ in range(samples):
+            add(self.sample())
+            time.sleep(1.0 / samples)
+
+        for _ in range(refinements):
+            if high - low == float("inf"):
+                break
+            # Aim the request so that, at the current best offset, it reaches the server right at a tick
+            offset = (low + high) / 2
+            rtt = sorted(rtts)[len(rtts) // 2]
+            next_tick = int(time.time() + offset) + 1
+            send_at = next_tick - offset - rtt / 2
+            delay = send_at - time.time()
+            if delay < 0.05:
+                send_at += 1
+                delay += 1
+            time.sleep(delay)
+            add(self.sample())
+
+        if not rtts or high - low == float("inf"):
+            logging.warning("Could not sync with the server clock; using the local clock.")
+            return self.offset
+
+        self.offset = (low + high) / 2
+        self.uncertainty = (high - low) / 2
+        self.rtt = sorted(rtts)[len(rtts) // 2]
+        logging.info(
+            f"Server clock offset {self.offset * 1000:+.0f}ms (±{self.uncertainty * 1000:.0f}ms), "
+            f"round trip {self.rtt * 1000:.0f}ms over {len(rtts)} requests."
+        )
+        return self.offset
+
+    def now(self):
+        """The current server time as a Unix timestamp."""
+        return time.time() + self.offset
+
+    def to_local(self, server_timestamp):
+        return server_timestamp - self.offset
+
+    def sleep_until(self, server_timestamp, fine_window=0.3, resync_before=60.0, warm=None, warm_before=5.0):
+        """
+        Blocks until the server clock reaches server_timestamp.
+
+        Coarse sleeps cover most of the wait. resync_before seconds ahead the offset is measured
+        again (which also warms the connection) and warm(), if given, is called warm_before
+        seconds ahead. The last fine_window seconds are spun on perf_counter, since a sleep
+        can overshoot by several milliseconds.
+        """
+        checkpoints = [(resync_before, self.sync), (warm_before, warm)]
+        for lead, action in checkpoints:
+            remaining = self.to_local(server_timestamp) - lead - time.time()
+            if remaining > 0:
+                self._coarse_sleep(remaining)
+            # Skipped when the wait was too short to fit it in
+            if action and self.to_local(server_timestamp) - time.time() >= lead * 0.5:
+                action()
+
+        remaining = self.to_local(server_timestamp) - time.time()
+        if remaining > fine_window:
+            self._coarse_sleep(remaining - fine_window)
+
+        target = time.perf_counter() + (self.to_local(server_timestamp) - time.time())
+        while time.perf_counter() < target:
+            pass
+
+    @staticmethod
+    def _coarse_sleep(seconds):
+        # Sleep in chunks so a long wait keeps tracking the wall clock
+        deadline = time.time() + seconds
+        while time.time() < deadline:
+            time.sleep(max(0.0, min(deadline - time.time(), 30.0)))
+
+def next_local_midnight(timestamp):
+    """The Unix timestamp of the next local-time midnight after timestamp."""
+    now = datetime.fromtimestamp(timestamp)
+    return datetime.combine(now.date() + timedelta(days=1), datetime.min.time()).timestamp()
@@ -1,36 +1,46 @@
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 import time
 
-def login_to_orbi_and_comment(username, password, article_number, comment_word, num_comments):
+from selenium.webdriver.common.by import By
+
+from orbi_driver import make_driver
+from orbi_http import SITE_URL
+from orbi_session import ensure_logged_in, prompt_credentials
+from orbi_wait import WAIT_STATS, element_clickable, wait_until
+
+# Seconds between comments, to mimic human behavior
+COMMENT_INTERVAL = 2
+
+def comment_box_cleared(driver):
+    """True once the comment box is empty again (looked up fresh, since posting may re-render it)."""
+    return not driver.find_element(By.NAME, "content").get_attribute("value")
+
+def login_to_orbi_and_comment(username, password, article_number, comment_word, num_comments, profile="visible",
+                              interval=COMMENT_INTERVAL):
     # Set up WebDriver
-    login_url = "https://login.orbi.kr/login"
-    base_url = "https://orbi.kr/"
+    base_url = f"{SITE_URL}/"
     article_url = f"{base_url}{article_number}"  # Construct the article URL
 
     # Start WebDriver
-    driver = webdriver.Chrome()  # Ensure you have the ChromeDriver installed and accessible
-    driver.get(login_url)
+    driver = make_driver(profile)  # Ensure you have the ChromeDriver installed and accessible
 
     try:
-        # Log in to Orbi
-        time.sleep(3)  # Allow time for the page to load
-        driver.find_element(By.NAME, "username").send_keys(username)  # Locate username field by "name"
-        driver.find_element(By.NAME, "password").send_keys(password)  # Locate password field by "name"
-        driver.find_element(By.NAME, "password").send_keys(Keys.RETURN)  # Submit the login form
-        time.sleep(3)  # Wait for login to complete
+        # Log in to Orbi, reusing the saved session if there is one.
+        # Without a username the credentials are only prompted for when a fresh login is needed.
+        credentials = (username, password) if username else prompt_credentials
+        if not ensure_logged_in(driver, credentials):
+            return
 
         # Navigate to the article
         driver.get(article_url)
-        time.sleep(3)
 
         # Post comments
         for i in range(num_comments):
-            # Locate the comment input field
-            comment_area = driver.find_element(By.NAME, "content")  # Locate by "name"
+            # Locate the comment input field as soon as it can be used
+            comment_area = element_clickable(driver, By.NAME, "content")  # Locate by "name"
+            if not comment_area:
+                print("Comment box not found.")
+                break
             comment_area.click()  # Activate the comment input field
-            time.sleep(1)  # Allow the input area to activate
 
             # Enter the comment text
             comment_area.send_keys(comment_word)
@@ -39,19 +49,25 @@ def login_to_orbi_and_comment(username, password, article_number, comment_word,
             post_button = driver.find_element(By.CLASS_NAME, "send")  # Locate the post button by "class"
             post_button.click()
 
-            print(f"Comment {i + 1} posted.")
-            time.sleep(2)  # Add delay to mimic human behavior
+            # The box is cleared once the comment has gone through
+            if wait_until(driver, comment_box_cleared, timeout=5, name="comment posted"):
+                print(f"Comment {i + 1} posted.")
+            else:
+                print(f"Comment {i + 1} may not have been posted: the comment box was not cleared.")
+
+            if i < num_comments - 1:
+                time.sleep(interval)  # Add delay to mimic human behavior
 
     except Exception as e:
         print(f"An error occurred: {e}")
     finally:
+        for line in WAIT_STATS.summary():
+            print(f"Wait {line}")
         driver.quit()
 
 if __name__ == "__main__":
-    username = input("Enter your Orbi username/email: ")
-    password = input("Enter your password: ")
     article_number = input("Enter the article number (last digits of the URL): ")
     comment_word = input("Enter the word to comment: ")
     num_comments = int(input("Enter the number of comments to post: "))
 
-    login_to_orbi_and_comment(username, password, article_number, comment_word, num_comments)
\ No newline at end of file
+    login_to_orbi_and_comment(None, None, article_number, comment_word, num_comments)
\ No newline at end of file
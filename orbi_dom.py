@@ -0,0 +1,44 @@
+# Reads many elements in one execute_script call instead of several WebDriver round trips per element.
+# Everything is read inside the page in one go, so the results cannot go stale halfway through.
+
+# Arguments: root selector (or null for the whole document), item selector, and a map of
+# field name -> [selector inside the item (or null for the item itself), "text" or an attribute].
+# Attributes are read as DOM properties first, so href and src come back as absolute URLs like
+# Selenium's get_attribute does. Returns null if the root is missing.
+EXTRACT_RECORDS_SCRIPT = """
+const [rootSelector, itemSelector, fields] = arguments;
+const root = rootSelector ? document.querySelector(rootSelector) : document;
+if (!root) return null;
+return Array.from(root.querySelectorAll(itemSelector), item => {
+    const record = {};
+    for (const [name, [selector, attribute]] of Object.entries(fields)) {
+        const node = selector ? item.querySelector(selector) : item;
+        if (!node) {
+            record[name] = null;
+        } else if (attribute === "text") {
+            record[name] = node.innerText.trim();
+        } else {
+            const value = node[attribute];
+            record[name] = typeof value === "string" ? value : node.getAttribute(attribute);
+        }
+    }
+    return record;
+});
+"""
+
+def extract_records(driver, item_selector, fields, root_selector=None):
+    """
+    Returns one dict per element matching item_selector (inside root_selector, if given), with
+    the requested fields, in a single WebDriver call. fields maps a name to (selector, "text"
+    or attribute name), e.g. {"title": ("p.title", "text"), "href": ("a", "href")}. Missing
+    fields are None. Returns None if root_selector matches nothing.
+    """
+    fields = {name: list(spec) for name, spec in fields.items()}
+    return driver.execute_script(EXTRACT_RECORDS_SCRIPT, root_selector, item_selector, fields)
+
+def extract_attribute(driver, selector, attribute, root_selector=None):
+    """Returns the non-empty values of one attribute (or "text") of every matching element, or None if the root is missing."""
+    records = extract_records(driver, selector, {"value": (None, attribute)}, root_selector)
+    if records is None:
+        return None
+    return [record["value"] for record in records if record["value"]]
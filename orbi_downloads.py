@@ -0,0 +1,186 @@
+import hashlib
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import namedtuple
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+import requests
+
+from orbi_metrics import METRICS
+
+# Statuses worth retrying; anything else that is not 200/206 is a permanent failure
+TRANSIENT_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+CONTENT_RANGE_PATTERN = re.compile(r"bytes (\d+)-\d+/(\d+|\*)")
+
+DownloadResult = namedtuple("DownloadResult", ["size", "downloaded", "content_type", "digest"])
+
+class TransientDownloadError(Exception):
+    """A download failed in a way that is worth retrying."""
+
+def backoff_delay(attempt, base=0.5, cap=30.0):
+    """Exponential backoff with full jitter: a random delay up to base * 2**attempt, capped."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def download_to_file(url, path, session, chunk_size=64 * 1024, retries=4, host_limiter=None,
+                     hash_name=None, timeout=30):
+    """
+    Downloads url to path atomically and returns a DownloadResult, or None on failure.
+
+    Bytes go to path + ".part" and are renamed into place only once the transfer is complete
+    and matches Content-Length, so path never holds a truncated file. An interrupted transfer
+    is resumed with a Range request when the server supports it. Transient failures are retried
+    up to `retries` times with jittered exponential backoff. A HostLimiter caps the concurrent
+    requests per host. With hash_name (e.g. "sha256") the file is hashed as it is written.
+    """
+    part_path = path + ".part"
+    for attempt in range(retries + 1):
+        try:
+            with host_limiter.slot(url) if host_limiter else nullcontext():
+                return _transfer(url, path, part_path, session, chunk_size, hash_name, timeout)
+        except (TransientDownloadError, requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError) as e:
+            if attempt == retries:
+                logging.error(f"Giving up on {url} after {retries + 1} attempts: {e}")
+                return None
+            delay = backoff_delay(attempt)
+            logging.warning(f"Download of {url} failed ({e}); retrying in {delay:.1f}s...")
+            time.sleep(delay)
+
+def _transfer(url, path, part_path, session, chunk_size, hash_name, timeout):
+    with METRICS.timer("orbi_download_seconds", host=urlsplit(url).netloc):
+        return _transfer_once(url, path, part_path, session, chunk_size, hash_name, timeout)
+
+def _transfer_once(url, path, part_path, session, chunk_size, hash_name, timeout):
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    with session.get(url, stream=True, headers=headers, timeout=timeout) as response:
+        if response.status_code == 416 and offset:
+            # The partial file no longer fits what the server has; start over
+            os.remove(part_path)
+            raise TransientDownloadError("Range not satisfiable, restarting the transfer")
+        if response.status_code in TRANSIENT_STATUSES:
+            raise TransientDownloadError(f"HTTP {response.status_code}")
+
+        content_range = CONTENT_RANGE_PATTERN.match(response.headers.get("Content-Range", ""))
+        if response.status_code == 206 and content_range and int(content_range.group(1)) == offset:
+            mode = "ab"
+            total = content_range.group(2)
+            expected_size = int(total) if total != "*" else None
+        elif response.status_code == 200:
+            # No resume support (or nothing to resume): rewrite from the start
+            offset = 0
+            mode = "wb"
+            length = response.headers.get("Content-Length")
+            # A compressed body is decoded while streaming, so its length cannot be checked
+            encoded = response.headers.get("Content-Encoding", "identity") != "identity"
+            expected_size = int(length) if length and not encoded else None
+        else:
+            logging.error(f"Failed to download {url}. Status code: {response.status_code}")
+            return None
+
+        hasher = hashlib.new(hash_name) if hash_name else None
+        if hasher and offset:
+            with open(part_path, "rb") as file:
+                for chunk in iter(lambda: file.read(chunk_size), b""):
+                    hasher.update(chunk)
+
+        downloaded = 0
+        write_seconds = 0.0
+        with open(part_path, mode) as file:
+            for chunk in response.iter_content(chunk_size):
+                write_start = time.perf_counter()
+                file.write(chunk)
+                write_seconds += time.perf_counter() - write_start
+                downloaded += len(chunk)
+                if hasher:
+                    hasher.update(chunk)
+        METRICS.observe("orbi_disk_write_seconds", write_seconds, kind="download")
+        METRICS.inc("orbi_http_response_bytes_total", downloaded, host=urlsplit(url).netloc)
+        content_type = response.headers.get("Content-Type")
+
+    size = os.path.getsize(part_path)
+    if expected_size is not None and size != expected_size:
+        if size > expected_size:
+            os.remove(part_path)  # Cannot be a prefix of the real file; resuming would not help
+        raise TransientDownloadError(f"Expected {expected_size} bytes, got {size}")
+
+    os.replace(part_path, path)
+    return DownloadResult(size, downloaded, content_type, hasher.hexdigest() if hasher else None)
+
+class DownloadPool:
+    """
+    Worker threads that download (url, save_path) jobs from a bounded queue.
+
+    submit() blocks while the queue is full, so a crawler feeding the pool can never
+    get more than queue_size images ahead of the downloads. `download` is called as
+    download(url, save_path, session) and returns the number of bytes written, or
+    None if the download failed.
+    """
+
+    def __init__(self, download, session=None, workers=4, queue_size=64):
+        self.download = download
+        self.session = session
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.images = 0
+        self.failures = 0
+        self.bytes = 0
+        self._lock = threading.Lock()
+        self.start_time = time.monotonic()
+        self.threads = [
+            threading.Thread(target=self._work, name=f"download-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, url, save_path):
+        """Queues an image for download, waiting for room if the workers are behind."""
+        self.jobs.put((url, save_path))
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                return
+            try:
+                written = self.download(job[0], job[1], self.session)
+            except Exception as e:
+                logging.error(f"Error downloading image: {e}")
+                written = None
+            with self._lock:
+                if written is None:
+                    self.failures += 1
+                else:
+                    self.images += 1
+                    self.bytes += written
+            self.jobs.task_done()
+
+    def close(self):
+        """Waits for every queued download to finish, stops the workers and logs a summary."""
+        for _ in self.threads:
+            self.jobs.put(None)
+        for thread in self.threads:
+            thread.join()
+        logging.info(self.summary())
+
+    def summary(self):
+        elapsed = max(time.monotonic() - self.start_time, 1e-9)
+        return (
+            f"Downloaded {self.images} images ({self.bytes / 1024 / 1024:.1f} MiB, {self.failures} failed) "
+            f"in {elapsed:.1f}s: {self.images / elapsed:.2f} images/sec, {self.bytes / 1024 / elapsed:.1f} KiB/sec"
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,259 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+
+from orbi_metrics import METRICS
+
+try:
+    import fcntl
+except ImportError:  # Windows locks cache directories through msvcrt instead
+    fcntl = None
+    import msvcrt
+
+# Shared between runs, so later launches start with a warm browser cache. Each live browser
+# uses its own numbered subdirectory, locked against other processes, since Chrome instances cannot share one.
+DEFAULT_BROWSER_CACHE_DIR = ".orbi_browser_cache"
+
+# Resources the scraping profiles never need. Images are blocked through a content setting instead,
+# which also stops the browser from decoding them.
+BLOCKED_URL_PATTERNS = [
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.mp4", "*.webm", "*.mp3", "*.m4a",
+]
+
+DriverProfile = namedtuple(
+    "DriverProfile",
+    ["headless", "page_load_strategy", "block_images", "block_styles", "prefs", "arguments"],
+    defaults=[True, "eager", False, False, {}, []],
+)
+
+PROFILES = {
+    # Reading pages only: no images, stylesheets, fonts or media, and no waiting for the load event
+    "scrape": DriverProfile(block_images=True, block_styles=True),
+    # Headless jobs that click through forms; stylesheets stay so visibility checks still mean something
+    "interactive": DriverProfile(block_images=True),
+    # Headless with nothing blocked, for unattended runs of the jobs that normally use "visible"
+    "headless": DriverProfile(),
+    # A browser the user can watch, with nothing blocked (the lottery clicks an image)
+    "visible": DriverProfile(
+        headless=False,
+        prefs={
+            "profile.default_content_setting_values.popups": 2,  # Block pop-ups
+            "profile.default_content_setting_values.notifications": 2,  # Block notifications
+        },
+        arguments=["--disable-popup-blocking"],  # Ensures pop-ups don't interfere
+    ),
+}
+
+def chrome_options(profile="scrape", cache_dir=DEFAULT_BROWSER_CACHE_DIR):
+    """Returns ChromeOptions for a named profile (see PROFILES) or a DriverProfile."""
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    options = webdriver.ChromeOptions()
+    options.page_load_strategy = profile.page_load_strategy
+    if profile.headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--disable-gpu")
+        options.add_argument("--window-size=1920,1080")
+    if cache_dir:
+        options.add_argument(f"--disk-cache-dir={os.path.abspath(cache_dir)}")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--no-first-run")
+
+    prefs = dict(profile.prefs)
+    if profile.block_images:
+        prefs["profile.managed_default_content_settings.images"] = 2
+    if prefs:
+        options.add_experimental_option("prefs", prefs)
+    for argument in profile.arguments:
+        options.add_argument(argument)
+    return options
+
+def lock_file(path):
+    """
+    Opens path and takes an exclusive lock on it without blocking. Returns the open file, which
+    holds the lock until closed (or the process exits), or None if another holder has it.
+    """
+    file = open(path, "a+b")
+    try:
+        if fcntl:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_NBLCK, 1)
+    except OSError:
+        file.close()
+        return None
+    return file
+
+def claim_cache_dir(cache_dir):
+    """
+    Returns (directory, lock) for the lowest numbered subdirectory of cache_dir that no live
+    browser, in this process or any other, is using. The directory is claimed until lock is closed.
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    number = 0
+    while True:
+        claimed = os.path.join(cache_dir, str(number))
+        # The lock sits next to the directory rather than in it, out of Chrome's way
+        lock = lock_file(f"{claimed}.lock")
+        if lock:
+            return claimed, lock
+        number += 1
+
+def make_driver(profile="scrape", cache_dir=DEFAULT_BROWSER_CACHE_DIR):
+    """
+    Starts Chrome with the given profile and returns the driver. Page loads are timed into orbi_metrics.
+    The browser caches into its own subdirectory of cache_dir until driver.quit() (see claim_cache_dir).
+    """
+    profile_name = profile if isinstance(profile, str) else "custom"
+    if isinstance(profile, str):
+        profile = PROFILES[profile]
+    start = time.monotonic()
+    claimed, lock = claim_cache_dir(cache_dir) if cache_dir else (None, None)
+    try:
+        driver = webdriver.Chrome(options=chrome_options(profile, claimed))
+    except BaseException:
+        if lock:
+            lock.close()
+        raise
+    if lock:
+        quit = driver.quit
+
+        def quit_and_release():
+            try:
+                quit()
+            finally:
+                lock.close()
+
+        driver.quit = quit_and_release
+    if profile.block_styles:
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except WebDriverException as e:
+            logging.warning(f"Could not block stylesheets and fonts: {e}")
+    METRICS.observe("orbi_webdriver_start_seconds", time.monotonic() - start, profile=profile_name)
+    logging.info(f"Chrome started in {time.monotonic() - start:.1f}s.")
+    return metered(driver)
+
+def metered(driver):
+    """Makes driver.get record its page load time in orbi_metrics.METRICS."""
+    get = driver.get
+
+    def timed_get(url):
+        with METRICS.timer("orbi_webdriver_get_seconds", host=urlsplit(url).netloc):
+            return get(url)
+
+    driver.get = timed_get
+    return driver
+
+def is_alive(driver):
+    """True if the browser still answers; a crashed or closed one raises on any command."""
+    try:
+        driver.current_url
+        return True
+    except WebDriverException:
+        return False
+
+class BrowserPool:
+    """
+    Long-lived browsers that jobs borrow and give back, so back-to-back jobs skip the Chrome launch.
+
+    Browsers are started lazily, up to `size` at a time. Each one gets its own cache directory
+    under cache_dir from make_driver. Cookies are kept between borrows, so a browser that has
+    logged in stays logged in. A browser that has died is replaced.
+    """
+
+    def __init__(self, profile="scrape", size=2, cache_dir=DEFAULT_BROWSER_CACHE_DIR):
+        self.profile = profile
+        self.size = size
+        self.cache_dir = cache_dir
+        self._slots = threading.BoundedSemaphore(size)
+        self._idle = []
+        self._lock = threading.Lock()
+        self._closed = False
+        self.launches = 0
+        self.borrows = 0
+
+    def _launch(self):
+        with self._lock:
+            self.launches += 1
+        return make_driver(self.profile, self.cache_dir)
+
+    def _quit(self, driver):
+        try:
+            driver.quit()
+        except WebDriverException:
+            pass
+
+    def acquire(self, timeout=None):
+        """Returns an idle browser, starting one if none is free. Blocks while all `size` are in use."""
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError(f"No browser became free within {timeout}s.")
+        try:
+            with self._lock:
+                self.borrows += 1
+            while True:
+                with self._lock:
+                    if self._closed:
+                        raise RuntimeError("Browser pool is closed.")
+                    driver = self._idle.pop() if self._idle else None
+                if driver is None:
+                    return self._launch()
+                if is_alive(driver):
+                    return driver
+                logging.warning("Pooled browser died; starting a new one.")
+                self._quit(driver)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, driver, broken=False):
+        """Gives a browser back. A broken one is shut down instead of reused."""
+        try:
+            if broken or self._closed or not is_alive(driver):
+                self._quit(driver)
+                return
+            with self._lock:
+                self._idle.append(driver)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        """with pool.borrow() as driver: ... returns the browser to the pool afterwards."""
+        driver = self.acquire(timeout)
+        broken = False
+        try:
+            yield driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(driver, broken)
+
+    def summary(self):
+        return f"Browser pool: {self.borrows} borrows served by {self.launches} Chrome launches"
+
+    def close(self):
+        """Shuts down the idle browsers; ones still borrowed are shut down when they are released."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self._quit(driver)
+        logging.info(self.summary())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,176 @@
+"""
+Local stand-in for orbi.kr, so the tools can be measured without touching the real site.
+
+Serves synthetic pages shaped like the real ones, which is all the parsers look at:
+
+    /search?type=imin&q=N&page=P   imin search results (--search-pages pages of --posts-per-page)
+    /list?page=P                   the post list (--list-pages pages)
+    /<post id>                     an article with --images-per-article images
+    /my/post?page=P                my posts (--my-post-pages pages)
+    /images/<name>.jpg             image bytes (--image-bytes each)
+    /robots.txt                    a tiny page, used for cookies and clock probes
+
+With --fixtures DIR, a recorded response is served instead wherever DIR holds a file named
+after the request path and query (see fixture_name). --latency adds a delay to every request.
+
+Point the tools at it with ORBI_BASE_URL=http://127.0.0.1:8800 before starting them.
+"""
+import argparse
+import hashlib
+import os
+import threading
+import time
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, quote, urlsplit
+
+# Post ids on the synthetic site count down from here, newest first
+FIRST_POST_ID = 71_000_000
+
+class FixtureSite:
+    """Generates the synthetic pages. Every page is a pure function of the settings and the URL."""
+
+    def __init__(self, search_pages=20, list_pages=5, my_post_pages=10, posts_per_page=20,
+                 images_per_article=3, image_bytes=32 * 1024, latency=0.0, fixtures=None):
+        self.search_pages = search_pages
+        self.list_pages = list_pages
+        self.my_post_pages = my_post_pages
+        self.posts_per_page = posts_per_page
+        self.images_per_article = images_per_article
+        self.image_bytes = image_bytes
+        self.latency = latency
+        self.fixtures = fixtures
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    @staticmethod
+    def page_html(title, body):
+        return f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title></head><body>{body}</body></html>"
+
+    def post_list(self, page, pages, prefix):
+        """A ul.post-list with a notice and three pinned posts on every page, then the page's posts."""
+        items = ['<li class="notice"><p class="title"><a href="/1">공지사항</a></p></li>']
+        items += [f'<li><p class="title"><a href="/{i + 2}">인기글 {i}</a></p></li>' for i in range(3)]
+        if 1 <= page <= pages:
+            for i in range(self.posts_per_page):
+                post_id = FIRST_POST_ID - (page - 1) * self.posts_per_page - i
+                items.append(
+                    f'<li><p class="title"><a href="/{post_id:011d}">{prefix} {page}-{i} 수능 질문</a></p>'
+                    f'<span class="author">작성자</span></li>'
+                )
+        return f'<ul class="post-list">{"".join(items)}</ul>'
+
+    def my_post_list(self, page):
+        """My posts have no notice or pinned posts; past the last page the list is empty."""
+        items = []
+        if 1 <= page <= self.my_post_pages:
+            for i in range(self.posts_per_page):
+                post_id = FIRST_POST_ID - (page - 1) * self.posts_per_page - i
+                items.append(f'<li><a href="/{post_id:011d}"><p class="title">내 글 {page}-{i}</p></a></li>')
+        return f'<ul class="post-list">{"".join(items)}</ul>'
+
+    def article(self, post_id):
+        images = "".join(f'<p><img src="/images/{post_id}_{i}.jpg"></p>' for i in range(self.images_per_article))
+        return f'<div class="content-wrap"><p>본문 {post_id}</p>{images}</div>'
+
+    def image(self, name):
+        # Deterministic bytes per name, so reruns hit the same content hashes
+        seed = hashlib.sha256(name.encode("utf-8")).digest()
+        body = b"\xff\xd8\xff\xe0" + seed * (self.image_bytes // len(seed) + 1)
+        return body[:self.image_bytes]
+
+    def respond(self, path, query):
+        """Returns (status, content type, body) for a request."""
+        params = parse_qs(query)
+        page = int(params.get("page", ["1"])[0])
+        html = "text/html; charset=utf-8"
+
+        if path == "/search":
+            return 200, html, self.page_html("검색", self.post_list(page, self.search_pages, "imin")).encode("utf-8")
+        if path == "/list":
+            return 200, html, self.page_html("목록", self.post_list(page, self.list_pages, "글")).encode("utf-8")
+        if path == "/my/post":
+            return 200, html, self.page_html("내 글", self.my_post_list(page)).encode("utf-8")
+        if path == "/robots.txt":
+            return 200, "text/plain", b"User-agent: *\n"
+        if path.startswith("/images/"):
+            return 200, "image/jpeg", self.image(path[len("/images/"):])
+        if path.strip("/").isdigit():
+            post_id = int(path.strip("/"))
+            return 200, html, self.page_html(f"글 {post_id}", self.article(post_id)).encode("utf-8")
+        return 404, "text/plain", b"Not found\n"
+
+def fixture_name(path, query):
+    """The file name a recorded response for this request is looked up under."""
+    return quote(path.lstrip("/") + ("?" + query if query else ""), safe="") or "index"
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive, like the real site
+    site = None
+
+    def do_GET(self):
+        self.site.count_request()
+        if self.site.latency:
+            time.sleep(self.site.latency)
+        url = urlsplit(self.path)
+
+        recorded = os.path.join(self.site.fixtures, fixture_name(url.path, url.query)) if self.site.fixtures else None
+        if recorded and os.path.exists(recorded):
+            with open(recorded, "rb") as file:
+                status, content_type, body = 200, "text/html; charset=utf-8", file.read()
+        else:
+            status, content_type, body = self.site.respond(url.path, url.query)
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+    def date_time_string(self, timestamp=None):
+        return formatdate(timestamp, usegmt=True)
+
+    def log_message(self, format, *args):
+        pass  # Benchmarks make thousands of requests
+
+def start_server(site, host="127.0.0.1", port=0):
+    """Starts serving `site` on a background thread and returns the server; its base URL is server.base_url."""
+    handler = type("Handler", (FixtureHandler,), {"site": site})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.base_url = f"http://{host}:{server.server_address[1]}"
+    threading.Thread(target=server.serve_forever, name="fixture-server", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic stand-in for orbi.kr.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--search-pages", type=int, default=20)
+    parser.add_argument("--list-pages", type=int, default=5)
+    parser.add_argument("--my-post-pages", type=int, default=10)
+    parser.add_argument("--posts-per-page", type=int, default=20)
+    parser.add_argument("--images-per-article", type=int, default=3)
+    parser.add_argument("--image-bytes", type=int, default=32 * 1024)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument("--fixtures", help="directory of recorded responses to serve where present")
+    args = parser.parse_args()
+
+    site = FixtureSite(args.search_pages, args.list_pages, args.my_post_pages, args.posts_per_page,
+                       args.images_per_article, args.image_bytes, args.latency, args.fixtures)
+    server = start_server(site, args.host, args.port)
+    print(f"Serving on {server.base_url} (ORBI_BASE_URL={server.base_url}). Press Ctrl+C to stop.")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+from urllib.parse import urlsplit
+
+DEFAULT_FRONTIER_PATH = "crawl_frontier.sqlite3"
+
+# Article paths look like /00071234567 or /00071234567/some-slug
+POST_PATH_PATTERN = re.compile(r"^/(\d+)(?:/|$)")
+
+def post_id_from_url(url):
+    """Returns the numeric post id of an article URL, or None if the URL is not an article."""
+    match = POST_PATH_PATTERN.match(urlsplit(url).path)
+    return int(match.group(1)) if match else None
+
+class BloomFilter:
+    """Fixed-size Bloom filter over integers: no false negatives, about error_rate false positives."""
+
+    def __init__(self, capacity, error_rate=0.01):
+        self.capacity = capacity
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.to_bytes(8, "little", signed=True), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + i * second) % self.size for i in range(self.hash_count)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+class CrawlFrontier:
+    """
+    Persistent record of the articles already crawled, keyed by numeric post id.
+
+    Works as a drop-in for the visited-URL set (`link in frontier`, `frontier.add(link)`),
+    but survives restarts and keeps RAM bounded: ids live in SQLite and a fixed-size Bloom
+    filter in memory answers most "not visited yet" checks without touching the disk.
+    The filter is rebuilt at twice the size if the crawl outgrows it.
+    """
+
+    def __init__(self, path=DEFAULT_FRONTIER_PATH, capacity=1_000_000, error_rate=0.01):
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS visited (post_id INTEGER PRIMARY KEY, visited_at REAL NOT NULL)"
+            )
+            # Links without a numeric post id are rare; they are kept by full URL
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS visited_urls (url TEXT PRIMARY KEY, visited_at REAL NOT NULL)"
+            )
+        stored = self.connection.execute("SELECT COUNT(*) FROM visited").fetchone()[0]
+        self._build_filter(max(capacity, stored * 2))
+
+    def _build_filter(self, capacity):
+        self.bloom = BloomFilter(capacity, self.error_rate)
+        for (post_id,) in self.connection.execute("SELECT post_id FROM visited"):
+            self.bloom.add(post_id)
+
+    def __contains__(self, url):
+        post_id = post_id_from_url(url)
+        with self._lock:
+            if post_id is None:
+                return self.connection.execute("SELECT 1 FROM visited_urls WHERE url = ?", (url,)).fetchone() is not None
+            if post_id not in self.bloom:
+                return False
+            # Possible false positive; SQLite has the final say
+            return self.connection.execute("SELECT 1 FROM visited WHERE post_id = ?", (post_id,)).fetchone() is not None
+
+    def add(self, url):
+        """Marks the article at url as visited."""
+        post_id = post_id_from_url(url)
+        now = time.time()
+        with self._lock, self.connection:
+            if post_id is None:
+                self.connection.execute("INSERT OR IGNORE INTO visited_urls (url, visited_at) VALUES (?, ?)", (url, now))
+                return
+            inserted = self.connection.execute(
+                "INSERT OR IGNORE INTO visited (post_id, visited_at) VALUES (?, ?)", (post_id, now)
+            ).rowcount
+            if inserted:
+                self.bloom.add(post_id)
+                if self.bloom.count > self.bloom.capacity:
+                    self._build_filter(self.bloom.capacity * 2)
+
+    def __len__(self):
+        with self._lock:
+            return (
+                self.connection.execute("SELECT COUNT(*) FROM visited").fetchone()[0]
+                + self.connection.execute("SELECT COUNT(*) FROM visited_urls").fetchone()[0]
+            )
+
+    def newest_post_id(self):
+        """Returns the highest post id visited so far, or None."""
+        with self._lock:
+            return self.connection.execute("SELECT MAX(post_id) FROM visited").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from orbi_cache import CachingAdapter
+from orbi_metrics import METRICS
+
+# Everything on the main site is addressed relative to this, so the tools can be pointed at a
+# stand-in server (see orbi_fixture_server) by setting ORBI_BASE_URL before they are imported
+SITE_URL = os.environ.get("ORBI_BASE_URL", "https://orbi.kr").rstrip("/")
+
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 "
+    "(KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+)
+
+class MeteredSession(requests.Session):
+    """A requests.Session that records every request in orbi_metrics.METRICS."""
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).netloc
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+        except requests.RequestException as e:
+            METRICS.inc("orbi_http_errors_total", host=host, error=type(e).__name__)
+            raise
+        # Redirect hops are sent (and recorded) through send() themselves; record only this request's own hop
+        first = response.history[0] if response.history else response
+        status = str(first.status_code)
+        cached = "yes" if getattr(first, "from_cache", False) else "no"
+        METRICS.inc("orbi_http_requests_total", host=host, method=request.method, status=status, cached=cached)
+        METRICS.observe("orbi_http_ttfb_seconds", first.elapsed.total_seconds(), host=host, cached=cached)
+        if not kwargs.get("stream"):
+            # The body has been read by now, so this covers the whole transfer
+            METRICS.observe("orbi_http_request_seconds", time.perf_counter() - start, host=host, status=status, cached=cached)
+            METRICS.inc("orbi_http_response_bytes_total", len(response.content), host=host)
+        return response
+
+def make_session(pool_size=10, cache=None):
+    """
+    Returns a requests.Session with a keep-alive connection pool of the given size.
+    Given an orbi_cache.HttpCache, GET responses are served from and stored in it.
+    Requests are recorded in orbi_metrics.METRICS.
+    """
+    session = MeteredSession()
+    if cache is not None:
+        adapter = CachingAdapter(cache, pool_connections=pool_size, pool_maxsize=pool_size)
+    else:
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+class RateLimiter:
+    """
+    Caps the request rate per host. Call wait(url) before every request;
+    it blocks until the host's next slot is free. Safe to share between threads.
+
+    This is a token bucket holding `burst` tokens: after an idle spell up to `burst` requests
+    go out at once, then one per 1 / max_per_second. Callers get slots in the order they ask.
+    """
+
+    def __init__(self, max_per_second, burst=1):
+        self.interval = 1.0 / max_per_second if max_per_second else 0.0
+        self.burst = max(1, burst)
+        self._next_slot = {}
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        if not self.interval:
+            return
+        host = urlsplit(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            # _next_slot is when the next request is due at the steady rate; saved-up tokens let it go early
+            due = max(now, self._next_slot.get(host, now))
+            slot = max(now, due - (self.burst - 1) * self.interval)
+            self._next_slot[host] = due + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class HostLimiter:
+    """
+    Caps the number of concurrent requests per host. Use `with limiter.slot(url):`
+    around a request. Safe to share between threads.
+    """
+
+    def __init__(self, max_per_host):
+        self.max_per_host = max_per_host
+        self._semaphores = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, url):
+        host = urlsplit(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+        with semaphore:
+            yield
@@ -1,123 +1,347 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
 import logging
 import os
 import requests
 import time
+from functools import partial
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from imin_parser import SKIPPED_POSTS
+from orbi_archive import ArticleArchive
+from orbi_cache import HttpCache
+from orbi_driver import make_driver
+from orbi_dom import extract_attribute
+from orbi_downloads import DownloadPool, download_to_file
+from orbi_frontier import CrawlFrontier, post_id_from_url
+from orbi_image_store import ImageStore
+from orbi_metrics import METRICS
+from orbi_http import SITE_URL, HostLimiter, make_session
+from orbi_wait import element_present, log_wait_stats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+LIST_URL = f"{SITE_URL}/list"
+IMAGE_DOWNLOAD_DIR = "downloaded_images"
+
+# Image downloads run on a worker pool fed through a bounded queue
+DOWNLOAD_WORKERS = 4
+DOWNLOAD_QUEUE_SIZE = 64
+CHUNK_SIZE = 64 * 1024
+MAX_CONNECTIONS_PER_HOST = 4
+
+# How many list pages to walk forward when a burst of new posts overflows the first page
+MAX_LIST_PAGES = 10
+
 def wait_for_element(driver, by, value, timeout=10):
     """
     Wait for an element to be located and return it.
+    Returns as soon as it appears; the wait time is recorded in orbi_wait.WAIT_STATS.
     """
-    try:
-        return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
-    except TimeoutException:
+    element = element_present(driver, by, value, timeout)
+    if element is None:
         logging.error(f"Element with {by} = {value} not found within {timeout} seconds.")
-        return None
+    return element
 
-def download_image(url, save_path):
+def download_image(url, save_path, session=None, store=None, host_limiter=None):
     """
     Download an image from the given URL and save it to the specified path.
+    Uses the given requests.Session (e.g. one backed by an HttpCache) if provided.
+    With an ImageStore, the image is stored once by content and save_path (with the
+    image's real extension) becomes a link to it.
+    The file is written atomically, interrupted transfers are resumed and transient
+    failures retried (see orbi_downloads.download_to_file).
+    Returns the number of bytes downloaded, or None if the download failed.
     """
     try:
-        response = requests.get(url, stream=True)
-        if response.status_code == 200:
-            with open(save_path, 'wb') as file:
-                for chunk in response.iter_content(1024):
-                    file.write(chunk)
-            logging.info(f"Image downloaded: {save_path}")
-        else:
-            logging.error(f"Failed to download image. Status code: {response.status_code}")
+        if store:
+            name = os.path.splitext(os.path.relpath(save_path, store.directory))[0]
+            return store.download(url, name, session or requests, host_limiter)
+
+        result = download_to_file(url, save_path, session or requests, CHUNK_SIZE, host_limiter=host_limiter)
+        if result is None:
+            return None
+        logging.info(f"Image downloaded: {save_path}")
+        return result.downloaded
     except Exception as e:
         logging.error(f"Error downloading image: {e}")
+        return None
+
+def fetch_image(url, save_path, session=None, pool=None):
+    """Hands the image to the download pool if there is one, otherwise downloads it inline."""
+    if pool:
+        pool.submit(url, save_path)
+    else:
+        download_image(url, save_path, session)
 
-def process_articles(driver, visited_urls, run_time):
+class PollInterval:
     """
-    Process articles with images, download them, and repeat until the specified runtime elapses.
+    Adaptive delay between list polls: doubles (up to maximum) after every poll that found
+    nothing new and drops back to minimum as soon as new posts show up.
+    """
+
+    def __init__(self, minimum=2.0, maximum=60.0, factor=2.0):
+        self.minimum = minimum
+        self.maximum = maximum
+        self.factor = factor
+        self.interval = minimum
+
+    def update(self, found_new):
+        if found_new:
+            self.interval = self.minimum
+        else:
+            self.interval = min(self.maximum, self.interval * self.factor)
+        return self.interval
+
+def is_newer(link, newest_post_id):
+    """True if the link is an article above the newest post id seen so far (or nothing has been seen)."""
+    if newest_post_id is None:
+        return True
+    post_id = post_id_from_url(link)
+    return post_id is None or post_id > newest_post_id
+
+def collect_new_links(fetch_links, newest_post_id, max_pages=MAX_LIST_PAGES):
+    """
+    Returns the links on the list above newest_post_id, paging forward while every post on a page
+    is new so that bursts longer than one page are not missed. Returns None if there is no post list.
+    The pinned posts repeated at the top of every page are returned but not counted when deciding
+    whether to page forward.
     """
-    base_url = "https://orbi.kr/list"
-    image_download_dir = "downloaded_images"
-    os.makedirs(image_download_dir, exist_ok=True)
+    new_links = []
+    for page in range(1, max_pages + 1):
+        links = fetch_links(page)
+        if links is None:
+            return new_links if page > 1 else None
+        if not links:
+            break
+
+        fresh = [link for link in links if is_newer(link, newest_post_id)]
+        new_links.extend(fresh)
+        # Stop once the page's own posts reach ones we have already seen (or on the first run)
+        regular = links[SKIPPED_POSTS:]
+        if newest_post_id is None or not regular or not all(is_newer(link, newest_post_id) for link in regular):
+            break
+    else:
+        logging.warning(f"More than {max_pages} pages of new posts; older ones in the burst were skipped.")
+    return new_links
+
+def crawl_articles(fetch_links, process_article, visited_urls, run_time, poll_interval=None):
+    """
+    Polls the post list until run_time elapses and calls process_article(link) for every new article.
+
+    fetch_links(page) returns the article links on a list page, or None if it has no post list.
+    Only posts above the newest post id seen so far are processed. The poll interval backs
+    off while the list is quiet and resets when there is activity.
+    """
+    poll_interval = poll_interval or PollInterval()
+    # Resume from the newest article a CrawlFrontier remembers from earlier runs
+    newest_post_id = visited_urls.newest_post_id() if hasattr(visited_urls, "newest_post_id") else None
     start_time = time.time()
 
     while time.time() - start_time < run_time:
-        driver.get(base_url)
-
-        # Wait for the post list to load
-        if not wait_for_element(driver, By.CLASS_NAME, "post-list"):
+        links = collect_new_links(fetch_links, newest_post_id)
+        if links is None:
             logging.info("No post list found. Exiting.")
             break
 
-        try:
-            # Refresh the list of articles (excluding notices)
-            articles = driver.find_elements(By.CSS_SELECTOR, "ul.post-list > li:not(.notice)")
-        except Exception as e:
-            logging.error(f"Error locating articles: {e}")
-            continue
-
-        for article in articles:
+        new_links = [link for link in links if link not in visited_urls]
+        for link in new_links:
+            visited_urls.add(link)  # Mark link as visited
             try:
-                # Get the article link from <p class="title"> inside the <li>
-                title_element = article.find_element(By.CSS_SELECTOR, "p.title a")
-                link = title_element.get_attribute("href")
-
-                # Skip already visited links
-                if not link or link in visited_urls:
-                    continue
-
-                visited_urls.add(link)  # Mark link as visited
-
-                # Visit the article
-                driver.get(link)
-
-                # Wait for the content-wrap element to load
-                content_wrap = wait_for_element(driver, By.CLASS_NAME, "content-wrap")
-                if not content_wrap:
-                    logging.info(f"No 'content-wrap' found in article: {link}")
-                    continue
-
-                # Find all images in the content-wrap
-                try:
-                    images = content_wrap.find_elements(By.TAG_NAME, "img")
-                    for idx, img in enumerate(images):
-                        img_url = img.get_attribute("src")
-                        if img_url:
-                            save_path = os.path.join(image_download_dir, f"{link.split('/')[-1]}_img{idx}.jpg")
-                            download_image(img_url, save_path)
-                except Exception as e:
-                    logging.error(f"Error finding or downloading images in article: {e}")
-                    continue
-
-                logging.info(f"Processed article: {link}")
-
-            except StaleElementReferenceException:
-                logging.warning("Stale element detected while processing articles. Reloading...")
-                break
+                process_article(link)
             except Exception as e:
                 logging.error(f"Error processing article: {e}")
-                continue
 
-        logging.info("Reloading page and checking for new articles...")
-        time.sleep(2)  # Short delay before reloading
+        post_ids = [post_id for post_id in map(post_id_from_url, links) if post_id is not None]
+        if post_ids:
+            newest_post_id = max(post_ids + [newest_post_id or 0])
+
+        delay = min(poll_interval.update(bool(new_links)), max(0.0, run_time - (time.time() - start_time)))
+        logging.info(f"{len(new_links)} new articles. Checking again in {delay:.1f}s...")
+        time.sleep(delay)
 
     logging.info("Time elapsed. Stopping script.")
 
-def main():
-    # Configure Chrome WebDriver options
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920x1080")
+def list_page_url(page):
+    return LIST_URL if page == 1 else f"{LIST_URL}?page={page}"
+
+def archive_article(archive, link, body, **metadata):
+    """Adds an article page to an orbi_archive.ArticleArchive; failures are logged, not raised."""
+    post_id = post_id_from_url(link)
+    if post_id is None:
+        return
+    try:
+        archive.add(post_id, link, body, **metadata)
+    except Exception as e:
+        logging.error(f"Could not archive {link}: {e}")
+
+def process_articles(driver, visited_urls, run_time, session=None, pool=None, archive=None):
+    """
+    Process articles with images, download them, and repeat until the specified runtime elapses.
+    visited_urls is a set of article links or a CrawlFrontier. Images are fetched through
+    `session` if one is given, or queued on a DownloadPool if `pool` is given.
+    Given an orbi_archive.ArticleArchive, each article's HTML is also archived.
+    """
+    os.makedirs(IMAGE_DOWNLOAD_DIR, exist_ok=True)
+
+    def fetch_links(page):
+        driver.get(list_page_url(page))
 
+        # Wait for the post list to load
+        if not wait_for_element(driver, By.CLASS_NAME, "post-list"):
+            return None
+
+        # Read every link in one call, before navigating away
+        return extract_attribute(driver, "ul.post-list > li:not(.notice) p.title a", "href")
+
+    def process_article(link):
+        # Visit the article
+        driver.get(link)
+
+        # Wait for the content-wrap element to load
+        if not wait_for_element(driver, By.CLASS_NAME, "content-wrap"):
+            logging.info(f"No 'content-wrap' found in article: {link}")
+            return
+
+        if archive:
+            archive_article(archive, link, driver.page_source, source="browser")
+
+        # Read all image URLs in the content-wrap in one call
+        image_urls = extract_attribute(driver, "img", "src", root_selector=".content-wrap") or []
+        for idx, img_url in enumerate(image_urls):
+            save_path = os.path.join(IMAGE_DOWNLOAD_DIR, f"{link.split('/')[-1]}_img{idx}.jpg")
+            fetch_image(img_url, save_path, session, pool)
+
+        logging.info(f"Processed article: {link}")
+
+    crawl_articles(fetch_links, process_article, visited_urls, run_time)
+
+def parse_article_links(html, page_url=LIST_URL):
+    """
+    Returns absolute links to the articles (excluding notices) in a /list page's post list.
+    """
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("ul", class_="post-list"))
+    links = []
+    for title_link in soup.select("ul.post-list > li:not(.notice) p.title a[href]"):
+        links.append(urljoin(page_url, title_link["href"]))
+    return links
+
+def parse_image_urls(html, page_url):
+    """
+    Returns absolute URLs of the images inside an article's content-wrap,
+    or None if the article has no content-wrap.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    content_wrap = soup.find(class_="content-wrap")
+    if not content_wrap:
+        return None
+    return [urljoin(page_url, img["src"]) for img in content_wrap.find_all("img", src=True) if img["src"]]
+
+def process_articles_http(session, visited_urls, run_time, pool=None, archive=None):
+    """
+    Same crawl as process_articles, but the list and article pages are fetched over plain HTTP
+    and parsed directly, so no browser is needed.
+    """
+    os.makedirs(IMAGE_DOWNLOAD_DIR, exist_ok=True)
+
+    def fetch_links(page):
+        try:
+            # Always revalidate the list, even when the HTTP cache holds a recent copy
+            response = session.get(list_page_url(page), headers={"Cache-Control": "no-cache"})
+            response.raise_for_status()
+        except requests.RequestException as e:
+            logging.error(f"Error fetching the post list: {e}")
+            return []
+        with METRICS.timer("orbi_parse_seconds", parser="parse_article_links"):
+            return parse_article_links(response.content, response.url) or None
+
+    def process_article(link):
+        response = session.get(link)
+        response.raise_for_status()
+
+        with METRICS.timer("orbi_parse_seconds", parser="parse_image_urls"):
+            image_urls = parse_image_urls(response.content, response.url)
+        if image_urls is None:
+            logging.info(f"No 'content-wrap' found in article: {link}")
+            return
+
+        if archive:
+            archive_article(archive, link, response.content, source="http", status=response.status_code,
+                            content_type=response.headers.get("Content-Type"))
+
+        for idx, img_url in enumerate(image_urls):
+            save_path = os.path.join(IMAGE_DOWNLOAD_DIR, f"{link.split('/')[-1]}_img{idx}.jpg")
+            fetch_image(img_url, save_path, session, pool)
+
+        logging.info(f"Processed article: {link}")
+
+    crawl_articles(fetch_links, process_article, visited_urls, run_time)
+
+def run_crawl(run_time_seconds, use_browser=False, session=None, near_duplicates=None, archive_dir=None):
+    """
+    Crawls new articles for run_time_seconds and downloads their images into the image store.
+    Pages are fetched through `session` if one is given (the caller owns it), otherwise through
+    a new session backed by the on-disk HTTP cache. With use_browser the crawl runs in Chrome.
+    near_duplicates is None to skip the perceptual-hash stage, or "flag" / "collapse" to hash the
+    new images afterwards and flag (or collapse) near-duplicates (see orbi_phash.index_store).
+    With archive_dir, every article's HTML is kept in an orbi_archive.ArticleArchive there.
+    Returns {"articles", "images", "bytes", "failures"} for this run.
+    """
+    # Visited articles are kept on disk, so a restarted crawl skips everything already done
+    visited_urls = CrawlFrontier()
+
+    # Pages go through the on-disk HTTP cache. Images skip it: the image store already
+    # keeps each image once and knows which URLs it has seen.
+    cache = None if session else HttpCache()
+    page_session = session or make_session(cache=cache)
+    image_session = make_session(pool_size=DOWNLOAD_WORKERS)
+    store = ImageStore(IMAGE_DOWNLOAD_DIR)
+    archive = ArticleArchive(archive_dir) if archive_dir else None
+    download = partial(download_image, store=store, host_limiter=HostLimiter(MAX_CONNECTIONS_PER_HOST))
+
+    driver = None
+    visited_before = len(visited_urls)
     try:
-        driver = webdriver.Chrome(options=chrome_options)
+        with DownloadPool(download, image_session, DOWNLOAD_WORKERS, DOWNLOAD_QUEUE_SIZE) as pool:
+            if use_browser:
+                # Only links and image URLs are read, so nothing but the HTML is loaded
+                driver = make_driver("scrape")
+                process_articles(driver, visited_urls, run_time_seconds, page_session, pool, archive)
+                log_wait_stats()
+            else:
+                process_articles_http(page_session, visited_urls, run_time_seconds, pool, archive)
+        if near_duplicates:
+            from orbi_phash import index_store
+
+            index_store(store, collapse=near_duplicates == "collapse")
+        if cache:
+            logging.info(cache.summary())
+        logging.info(store.summary())
+        if archive:
+            logging.info(f"Article archive: {archive.stats()}")
+        logging.info(f"{len(visited_urls)} articles visited in total.")
+        return {
+            "articles": len(visited_urls) - visited_before,
+            "images": pool.images,
+            "bytes": pool.bytes,
+            "failures": pool.failures,
+        }
+    finally:
+        if driver:
+            driver.quit()
+        store.close()
+        if archive:
+            archive.close()
+        visited_urls.close()
+        image_session.close()
+        if cache:
+            page_session.close()
+            cache.close()
 
+def main():
+    try:
         # Get user-specified runtime in minutes
         try:
             run_time_minutes = int(input("Enter the runtime in minutes: "))
@@ -127,17 +351,14 @@ def main():
             logging.error(f"Invalid input: {e}")
             return
 
-        run_time_seconds = run_time_minutes * 60
-        visited_urls = set()
+        # The list and article pages are public, so the browser is only needed as a fallback
+        use_browser = input("Crawl with a browser instead of plain HTTP? [y/N]: ").strip().lower() == "y"
 
         logging.info(f"Script will run for {run_time_minutes} minutes.")
-        process_articles(driver, visited_urls, run_time_seconds)
+        run_crawl(run_time_minutes * 60, use_browser)
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
-    finally:
-        if 'driver' in locals():
-            driver.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
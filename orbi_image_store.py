@@ -0,0 +1,209 @@
+import hashlib
+import logging
+import mimetypes
+import os
+import sqlite3
+import threading
+
+from orbi_downloads import download_to_file
+
+# Extensions for the image types Orbi serves; anything else goes through mimetypes
+CONTENT_TYPE_EXTENSIONS = {
+    "image/jpeg": ".jpg",
+    "image/jpg": ".jpg",
+    "image/png": ".png",
+    "image/gif": ".gif",
+    "image/webp": ".webp",
+    "image/bmp": ".bmp",
+    "image/svg+xml": ".svg",
+}
+
+# Leading bytes of common image formats, used when Content-Type is missing or generic
+MAGIC_EXTENSIONS = [
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+    (b"GIF87a", ".gif"),
+    (b"GIF89a", ".gif"),
+    (b"BM", ".bmp"),
+]
+
+def guess_extension(content_type, head):
+    """Returns the file extension for an image from its Content-Type, falling back to its first bytes."""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in CONTENT_TYPE_EXTENSIONS:
+        return CONTENT_TYPE_EXTENSIONS[content_type]
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    for magic, extension in MAGIC_EXTENSIONS:
+        if head.startswith(magic):
+            return extension
+    return mimetypes.guess_extension(content_type) or ".bin"
+
+class ImageStore:
+    """
+    Content-addressed image store with deduplication.
+
+    Each distinct image is kept once under objects/<xx>/<sha256><ext>, hashed while it
+    streams in (downloads are atomic and resumable, see orbi_downloads.download_to_file).
+    Per-article names ({post_id}_img{idx}<ext>) are hardlinks to that object, and every
+    name is also recorded in a manifest in case the filesystem cannot hardlink.
+    A URL-to-digest index lets download() skip images it has already stored
+    without making a request.
+    """
+
+    def __init__(self, directory="downloaded_images", chunk_size=64 * 1024):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.stats = {"downloaded": 0, "deduplicated": 0, "skipped": 0}
+        self._lock = threading.Lock()
+        self._url_locks = [threading.Lock() for _ in range(64)]
+
+        os.makedirs(os.path.join(directory, "objects"), exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, "store.sqlite3"), check_same_thread=False)
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, digest TEXT NOT NULL, extension TEXT NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS objects (digest TEXT PRIMARY KEY, extension TEXT NOT NULL, size INTEGER NOT NULL)"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS manifest (name TEXT PRIMARY KEY, digest TEXT NOT NULL, url TEXT)"
+            )
+
+    def object_path(self, digest, extension):
+        return os.path.join(self.directory, "objects", digest[:2], digest + extension)
+
+    def lookup_url(self, url):
+        """Returns (digest, extension) if the image at url has been stored before, otherwise None."""
+        with self._lock:
+            return self.connection.execute("SELECT digest, extension FROM urls WHERE url = ?", (url,)).fetchone()
+
+    def download(self, url, name, session, host_limiter=None):
+        """
+        Stores the image at url (unless the URL is already indexed) and links it as `name` plus
+        the image's real extension. Returns the number of bytes downloaded, or None on failure.
+        """
+        # Workers fetching the same URL take turns, so the second one finds it indexed
+        with self._url_locks[hash(url) % len(self._url_locks)]:
+            return self._download(url, name, session, host_limiter)
+
+    def _download(self, url, name, session, host_limiter):
+        known = self.lookup_url(url)
+        if known:
+            self.link(known[0], known[1], name, url)
+            with self._lock:
+                self.stats["skipped"] += 1
+            return 0
+
+        # One incoming file per URL, so an interrupted transfer is resumed by the next attempt
+        url_key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        incoming_path = os.path.join(self.directory, "objects", f"incoming-{url_key}")
+        result = download_to_file(
+            url, incoming_path, session, self.chunk_size, host_limiter=host_limiter, hash_name="sha256"
+        )
+        if result is None:
+            return None
+
+        extension = self.put_file(incoming_path, result.digest, result.content_type)
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO urls (url, digest, extension) VALUES (?, ?, ?)", (url, result.digest, extension)
+            )
+        self.link(result.digest, extension, name, url)
+        logging.info(f"Image downloaded: {name}{extension} ({result.digest[:12]})")
+        return result.downloaded
+
+    def put_file(self, path, digest, content_type=None):
+        """
+        Moves a fully downloaded file with the given SHA-256 digest into the store and returns
+        its extension. If an identical object is already stored, the new copy is dropped.
+        """
+        with self._lock:
+            row = self.connection.execute("SELECT extension FROM objects WHERE digest = ?", (digest,)).fetchone()
+        if row and os.path.exists(self.object_path(digest, row[0])):
+            os.remove(path)
+            with self._lock:
+                self.stats["deduplicated"] += 1
+            return row[0]
+
+        with open(path, "rb") as file:
+            head = file.read(16)
+        extension = guess_extension(content_type, head)
+        object_path = self.object_path(digest, extension)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        os.replace(path, object_path)
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO objects (digest, extension, size) VALUES (?, ?, ?)",
+                (digest, extension, os.path.getsize(object_path)),
+            )
+            self.stats["downloaded"] += 1
+        return extension
+
+    def link(self, digest, extension, name, url=None):
+        """Records `name` in the manifest and hardlinks it to the stored object where possible."""
+        with self._lock, self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO manifest (name, digest, url) VALUES (?, ?, ?)", (name + extension, digest, url)
+            )
+
+        target = self.object_path(digest, extension)
+        link_path = os.path.join(self.directory, name + extension)
+        if os.path.exists(link_path) and os.path.samefile(link_path, target):
+            return
+        try:
+            # Link under a temp name first so an existing file is replaced atomically
+            temp_link = f"{link_path}.{threading.get_ident()}.tmp"
+            os.link(target, temp_link)
+            os.replace(temp_link, link_path)
+        except OSError as e:
+            logging.debug(f"Could not hardlink {link_path}, keeping the manifest entry only: {e}")
+
+    def replace_object(self, digest, canonical_digest):
+        """
+        Points every name and URL stored for `digest` at `canonical_digest` instead and deletes
+        the object for `digest`. Used to collapse near-duplicate images onto one copy.
+        Returns the number of names relinked.
+        """
+        with self._lock:
+            canonical = self.connection.execute(
+                "SELECT extension FROM objects WHERE digest = ?", (canonical_digest,)
+            ).fetchone()
+            old = self.connection.execute("SELECT extension FROM objects WHERE digest = ?", (digest,)).fetchone()
+            names = self.connection.execute("SELECT name, url FROM manifest WHERE digest = ?", (digest,)).fetchall()
+        if not canonical or not old:
+            return 0
+
+        for name, url in names:
+            base = name[:-len(old[0])] if old[0] and name.endswith(old[0]) else name
+            if old[0] != canonical[0]:
+                # The name takes the canonical object's extension; drop the link under the old one
+                with self._lock, self.connection:
+                    self.connection.execute("DELETE FROM manifest WHERE name = ?", (name,))
+                try:
+                    os.remove(os.path.join(self.directory, name))
+                except FileNotFoundError:
+                    pass
+            self.link(canonical_digest, canonical[0], base, url)
+
+        with self._lock, self.connection:
+            self.connection.execute(
+                "UPDATE urls SET digest = ?, extension = ? WHERE digest = ?", (canonical_digest, canonical[0], digest)
+            )
+            self.connection.execute("DELETE FROM objects WHERE digest = ?", (digest,))
+        try:
+            os.remove(self.object_path(digest, old[0]))
+        except FileNotFoundError:
+            pass
+        return len(names)
+
+    def summary(self):
+        return (
+            f"Image store: {self.stats['downloaded']} new images, {self.stats['deduplicated']} duplicate downloads "
+            f"dropped, {self.stats['skipped']} known URLs skipped without a request"
+        )
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
@@ -0,0 +1,171 @@
+"""
+In-process metrics for the Orbi tools: counters and latency histograms keyed by name and labels.
+
+Everything records into the shared METRICS registry:
+- HTTP requests, through the sessions from orbi_http.make_session.
+- WebDriver page loads and waits, through orbi_driver and orbi_wait.
+- Page parsing, through imin_scraper.
+- Downloads and their disk writes, through orbi_downloads.
+
+snapshot() returns the registry as JSON-ready data, prometheus() returns it in the Prometheus
+text format, and serve_metrics() exposes both on a local port (/metrics and /metrics.json).
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds, from fast cache hits to slow page loads
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+def _escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+class Metrics:
+    """Thread-safe registry of counters and histograms."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._counters = {}
+        self._histograms = {}
+        self._help = {}
+        self._lock = threading.Lock()
+
+    def describe(self, name, text):
+        """Sets the help text exported for a metric."""
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Records one observation (usually seconds) in a histogram."""
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    histogram["buckets"][i] += 1
+                    break
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Times the block into histogram `name`. Failures get outcome="error", others outcome="ok"."""
+        start = time.perf_counter()
+        outcome = "ok"
+        try:
+            yield
+        except BaseException:
+            outcome = "error"
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, outcome=outcome, **labels)
+
+    def snapshot(self):
+        """Returns {"counters": [...], "histograms": [...]}; histogram buckets are cumulative, like Prometheus."""
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted((key, dict(value, buckets=list(value["buckets"]))) for key, value in self._histograms.items())
+        result = {"counters": [], "histograms": []}
+        for (name, labels), value in counters:
+            result["counters"].append({"name": name, "labels": dict(labels), "value": value})
+        for (name, labels), histogram in histograms:
+            cumulative, buckets = 0, {}
+            for bound, count in zip(self.buckets, histogram["buckets"]):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            buckets["+Inf"] = histogram["count"]
+            result["histograms"].append({
+                "name": name,
+                "labels": dict(labels),
+                "count": histogram["count"],
+                "sum": histogram["sum"],
+                "buckets": buckets,
+            })
+        return result
+
+    def prometheus(self):
+        """Returns the registry in the Prometheus text exposition format."""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def header(name, kind):
+            if name not in typed:
+                typed.add(name)
+                if name in self._help:
+                    lines.append(f"# HELP {name} {self._help[name]}")
+                lines.append(f"# TYPE {name} {kind}")
+
+        for counter in snapshot["counters"]:
+            header(counter["name"], "counter")
+            lines.append(f"{counter['name']}{_format_labels(counter['labels'].items())} {counter['value']}")
+        for histogram in snapshot["histograms"]:
+            name, labels = histogram["name"], list(histogram["labels"].items())
+            header(name, "histogram")
+            for bound, count in histogram["buckets"].items():
+                lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {count}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+            lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.snapshot(), file, indent=2)
+
+METRICS = Metrics()
+METRICS.describe("orbi_http_requests_total", "HTTP requests by host, method, status and whether the cache answered.")
+METRICS.describe("orbi_http_errors_total", "HTTP requests that failed without a response.")
+METRICS.describe("orbi_http_ttfb_seconds", "Time from sending a request to its response headers, connection setup included.")
+METRICS.describe("orbi_http_request_seconds", "Time for a whole non-streamed request, body included.")
+METRICS.describe("orbi_http_response_bytes_total", "Response body bytes received.")
+METRICS.describe("orbi_download_seconds", "Time to transfer one download to disk.")
+METRICS.describe("orbi_disk_write_seconds", "Time spent in file writes.")
+METRICS.describe("orbi_parse_seconds", "Time to parse one page.")
+METRICS.describe("orbi_webdriver_start_seconds", "Time to launch Chrome.")
+METRICS.describe("orbi_webdriver_get_seconds", "Time for driver.get to return.")
+METRICS.describe("orbi_webdriver_wait_seconds", "Time spent in WebDriver condition waits.")
+
+def serve_metrics(port, host="127.0.0.1", metrics=METRICS):
+    """Serves /metrics (Prometheus text) and /metrics.json on a background thread. Returns the server."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics.json":
+                body, content_type = json.dumps(metrics.snapshot()).encode("utf-8"), "application/json"
+            elif self.path.split("?")[0] == "/metrics":
+                body, content_type = metrics.prometheus().encode("utf-8"), "text/plain; version=0.0.4"
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True).start()
+    logging.info(f"Metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
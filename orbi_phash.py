@@ -0,0 +1,275 @@
+"""
+Near-duplicate detection for the image store: the same picture re-encoded, resized or
+screenshotted hashes differently byte for byte, but almost the same perceptually.
+
+Each stored image gets a 64-bit pHash (low DCT frequencies) and dHash (brightness
+gradients). Hashes live in a SQLite index next to the store, split into four 16-bit bands
+that are each indexed. Two hashes within Hamming distance k must agree to within k // 4 bits
+on at least one band (pigeonhole), so a lookup only reads rows sharing a band value with a few
+bit flips of the query, instead of scanning every hash (multi-index hashing).
+
+    python orbi_phash.py index --max-distance 6 [--collapse]
+    python orbi_phash.py query some_image.jpg
+
+Decoding images needs Pillow (pip install Pillow).
+"""
+import argparse
+import logging
+import math
+import os
+import sqlite3
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; only hashing image files needs it
+    Image = None
+
+DEFAULT_MAX_DISTANCE = 6
+BANDS = 4
+BAND_BITS = 16
+BAND_MASK = (1 << BAND_BITS) - 1
+
+# Cosine table for the 8 lowest DCT frequencies over 32 samples
+DCT_SIZE = 32
+DCT_KEEP = 8
+DCT_COSINES = [
+    [math.cos((2 * x + 1) * u * math.pi / (2 * DCT_SIZE)) for x in range(DCT_SIZE)]
+    for u in range(DCT_KEEP)
+]
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+def dhash_pixels(pixels):
+    """dHash of a 9x8 grayscale image given as 72 row-major values: one bit per horizontal gradient."""
+    bits = 0
+    for y in range(8):
+        row = pixels[y * 9:(y + 1) * 9]
+        for x in range(8):
+            bits = (bits << 1) | (row[x] > row[x + 1])
+    return bits
+
+def phash_pixels(pixels):
+    """pHash of a 32x32 grayscale image given as 1024 row-major values: the 8x8 lowest DCT frequencies against their median."""
+    # Separable DCT, computing only the frequencies that are kept
+    rows = [
+        [sum(pixels[y * DCT_SIZE + x] * cosines[x] for x in range(DCT_SIZE)) for cosines in DCT_COSINES]
+        for y in range(DCT_SIZE)
+    ]
+    coefficients = [
+        sum(rows[y][u] * DCT_COSINES[v][y] for y in range(DCT_SIZE))
+        for v in range(DCT_KEEP) for u in range(DCT_KEEP)
+    ]
+    # The DC term only reflects overall brightness, so it is left out of the median
+    median = sorted(coefficients[1:])[len(coefficients[1:]) // 2]
+    bits = 0
+    for value in coefficients:
+        bits = (bits << 1) | (value > median)
+    return bits
+
+def image_hashes(path):
+    """Returns (phash, dhash) of an image file, or None if it cannot be decoded. Needs Pillow."""
+    if Image is None:
+        raise RuntimeError("Hashing images needs Pillow: pip install Pillow")
+    try:
+        with Image.open(path) as image:
+            # Lets JPEGs decode at a fraction of full size, which is all the hashes look at
+            image.draft("L", (64, 64))
+            gray = image.convert("L")
+            phash = phash_pixels(list(gray.resize((DCT_SIZE, DCT_SIZE), Image.LANCZOS).getdata()))
+            dhash = dhash_pixels(list(gray.resize((9, 8), Image.LANCZOS).getdata()))
+            return phash, dhash
+    except Exception as e:
+        logging.debug(f"Could not hash {path}: {e}")
+        return None
+
+def _signed(value):
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _unsigned(value):
+    return value & ((1 << 64) - 1)
+
+def bands(value):
+    return [(value >> (BAND_BITS * i)) & BAND_MASK for i in range(BANDS)]
+
+def band_variants(band, radius):
+    """Every 16-bit value within `radius` bit flips of band."""
+    variants = [band]
+    for flips in range(1, radius + 1):
+        for positions in combinations(range(BAND_BITS), flips):
+            variant = band
+            for position in positions:
+                variant ^= 1 << position
+            variants.append(variant)
+    return variants
+
+class SimilarityIndex:
+    """
+    Perceptual hashes of stored images, keyed by the image's SHA-256 digest, with a band
+    index for sub-linear near-neighbour search. Near-duplicates found are recorded in a
+    near_duplicates table pointing at the image they duplicate.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS hashes (digest TEXT PRIMARY KEY, phash INTEGER, dhash INTEGER, "
+                + ", ".join(f"band{i} INTEGER" for i in range(BANDS)) + ")"
+            )
+            for i in range(BANDS):
+                self.connection.execute(f"CREATE INDEX IF NOT EXISTS hashes_band{i} ON hashes (band{i})")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS near_duplicates "
+                "(digest TEXT PRIMARY KEY, original TEXT NOT NULL, distance INTEGER NOT NULL)"
+            )
+
+    def add(self, digest, hashes):
+        """Stores an image's (phash, dhash), or None for an image that could not be decoded (so it is not retried)."""
+        if hashes is None:
+            row = (digest, None, None) + (None,) * BANDS
+        else:
+            phash, dhash = hashes
+            row = (digest, _signed(phash), _signed(dhash), *bands(phash))
+        self.connection.execute(f"INSERT OR REPLACE INTO hashes VALUES ({', '.join('?' * (3 + BANDS))})", row)
+
+    def search(self, phash, max_distance=DEFAULT_MAX_DISTANCE, dhash=None):
+        """
+        Returns [(distance, digest)] for the stored images within max_distance of phash, nearest
+        first. With a dhash, matches must also be within 2 * max_distance on it, which weeds out
+        the rare pHash collisions between unrelated images.
+        """
+        radius = max_distance // BANDS
+        found = {}
+        for i, band in enumerate(bands(phash)):
+            variants = band_variants(band, radius)
+            # Stay under SQLite's limit on query parameters
+            for start in range(0, len(variants), 500):
+                chunk = variants[start:start + 500]
+                rows = self.connection.execute(
+                    f"SELECT digest, phash, dhash FROM hashes WHERE band{i} IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                for digest, candidate, candidate_dhash in rows:
+                    if digest in found:
+                        continue
+                    distance = hamming(phash, _unsigned(candidate))
+                    if distance > max_distance:
+                        continue
+                    if dhash is not None and hamming(dhash, _unsigned(candidate_dhash)) > 2 * max_distance:
+                        continue
+                    found[digest] = distance
+        return sorted((distance, digest) for digest, distance in found.items())
+
+    def mark_duplicate(self, digest, original, distance):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO near_duplicates (digest, original, distance) VALUES (?, ?, ?)",
+            (digest, original, distance),
+        )
+
+    def unhashed(self, store_database):
+        """Returns [(digest, extension)] of the objects in an ImageStore database that have no hashes yet."""
+        self.connection.execute("ATTACH DATABASE ? AS store", (store_database,))
+        try:
+            return self.connection.execute(
+                "SELECT digest, extension FROM store.objects WHERE digest NOT IN (SELECT digest FROM hashes) ORDER BY rowid"
+            ).fetchall()
+        finally:
+            self.connection.execute("DETACH DATABASE store")
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+def index_store(store, max_distance=DEFAULT_MAX_DISTANCE, collapse=False, workers=None, batch_size=256):
+    """
+    Hashes every image in an ImageStore that has not been hashed yet, in a process pool, and
+    records each one that is within max_distance of an image indexed before it as a near-duplicate.
+    With collapse=True the duplicate's names are relinked to the earlier image and its copy is
+    deleted (see ImageStore.replace_object). Returns (hashed, near_duplicates).
+    """
+    index = SimilarityIndex(os.path.join(store.directory, "similarity.sqlite3"))
+    pending = index.unhashed(os.path.join(store.directory, "store.sqlite3"))
+    logging.info(f"Hashing {len(pending)} new images...")
+    hashed = duplicates = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for start in range(0, len(pending), batch_size):
+                batch = pending[start:start + batch_size]
+                paths = [store.object_path(digest, extension) for digest, extension in batch]
+                for (digest, _), hashes in zip(batch, executor.map(image_hashes, paths, chunksize=16)):
+                    if hashes is not None:
+                        matches = index.search(hashes[0], max_distance, dhash=hashes[1])
+                        if matches:
+                            distance, original = matches[0]
+                            index.mark_duplicate(digest, original, distance)
+                            duplicates += 1
+                            logging.info(f"{digest[:12]} is a near-duplicate of {original[:12]} (distance {distance})")
+                            if collapse:
+                                store.replace_object(digest, original)
+                                # The copy is gone; keep only the original in the index
+                                continue
+                    index.add(digest, hashes)
+                    hashed += 1
+                index.commit()
+                logging.info(f"Hashed {min(start + batch_size, len(pending))}/{len(pending)} images.")
+    finally:
+        index.close()
+    logging.info(f"Indexed {hashed} images, {duplicates} near-duplicates found.")
+    return hashed, duplicates
+
+def query(store_directory, path, max_distance=DEFAULT_MAX_DISTANCE, limit=20):
+    """Returns [(distance, digest, names)] for the stored images similar to the image at path."""
+    hashes = image_hashes(path)
+    if hashes is None:
+        raise ValueError(f"Cannot decode {path}")
+    index = SimilarityIndex(os.path.join(store_directory, "similarity.sqlite3"))
+    store = sqlite3.connect(os.path.join(store_directory, "store.sqlite3"))
+    try:
+        results = []
+        for distance, digest in index.search(hashes[0], max_distance, dhash=hashes[1])[:limit]:
+            names = [name for (name,) in store.execute("SELECT name FROM manifest WHERE digest = ?", (digest,))]
+            results.append((distance, digest, names))
+        return results
+    finally:
+        store.close()
+        index.close()
+
+def main(argv=None):
+    from orbi_image_downloader import IMAGE_DOWNLOAD_DIR
+    from orbi_image_store import ImageStore
+
+    parser = argparse.ArgumentParser(description="Find near-duplicate images in the image store.")
+    parser.add_argument("--store", default=IMAGE_DOWNLOAD_DIR, help=f"image store directory (default {IMAGE_DOWNLOAD_DIR})")
+    parser.add_argument("--max-distance", type=int, default=DEFAULT_MAX_DISTANCE,
+                        help=f"largest pHash Hamming distance counted as a near-duplicate (default {DEFAULT_MAX_DISTANCE})")
+    commands = parser.add_subparsers(dest="command", required=True)
+    index_command = commands.add_parser("index", help="hash new images and flag near-duplicates")
+    index_command.add_argument("--collapse", action="store_true", help="relink near-duplicates to the original and delete the copy")
+    index_command.add_argument("--workers", type=int, help="hashing processes (default: one per CPU)")
+    query_command = commands.add_parser("query", help="list stored images similar to an image file")
+    query_command.add_argument("image")
+    query_command.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    if args.command == "index":
+        store = ImageStore(args.store)
+        try:
+            index_store(store, args.max_distance, args.collapse, args.workers)
+        finally:
+            store.close()
+    else:
+        for distance, digest, names in query(args.store, args.image, args.max_distance, args.limit):
+            print(f"{distance}\t{digest}\t{', '.join(names)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import getpass
+import json
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+
+from orbi_http import SITE_URL, make_session
+from orbi_wait import element_present, left_host
+
+LOGIN_URL = "https://login.orbi.kr/login"
+LOGIN_HOST = "login.orbi.kr"
+# A page that redirects to the login page when the session is not logged in
+MY_POST_URL = f"{SITE_URL}/my/post"
+# A lightweight page on the main domain; the browser must be on it before cookies can be added
+COOKIE_LANDING_URL = f"{SITE_URL}/robots.txt"
+
+DEFAULT_COOKIE_PATH = "orbi_session.json"
+# Saved sessions are not trusted past this age, even if no cookie has expired yet
+MAX_SESSION_AGE = 7 * 24 * 60 * 60
+
+def prompt_credentials():
+    """Asks for the Orbi username and password on the terminal."""
+    username = input("Enter your Orbi username/email: ")
+    password = getpass.getpass("Enter your Orbi password: ")
+    return username, password
+
+def save_cookies(cookies, path=DEFAULT_COOKIE_PATH):
+    """Writes WebDriver-style cookie dicts to path atomically, readable by the owner only."""
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as file:
+        json.dump({"saved_at": time.time(), "cookies": cookies}, file)
+    os.chmod(temp_path, 0o600)
+    os.replace(temp_path, path)
+
+def load_cookies(path=DEFAULT_COOKIE_PATH):
+    """Returns the saved cookies that have not expired, or None if there are none or the session is too old."""
+    try:
+        with open(path, encoding="utf-8") as file:
+            saved = json.load(file)
+    except (OSError, ValueError):
+        return None
+
+    now = time.time()
+    if now - saved.get("saved_at", 0) > MAX_SESSION_AGE:
+        logging.info("Saved Orbi session is too old. Logging in again.")
+        return None
+    # Short-lived cookies (e.g. analytics) expire on their own; whether the login survived is up to is_logged_in
+    cookies = [cookie for cookie in saved.get("cookies") or [] if cookie.get("expiry", now + 1) > now]
+    if not cookies:
+        logging.info("Saved Orbi session has expired. Logging in again.")
+        return None
+    return cookies
+
+def session_from_cookies(cookies, pool_size=10, cache=None):
+    """Returns a pooled requests.Session (see orbi_http.make_session) carrying the given cookies."""
+    session = make_session(pool_size=pool_size, cache=cache)
+    for cookie in cookies:
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie.get("domain", ""),
+            path=cookie.get("path", "/"),
+            secure=cookie.get("secure", False),
+            expires=cookie.get("expiry"),
+        )
+    return session
+
+def is_logged_in(session):
+    """Checks over plain HTTP whether the session's cookies are still logged in."""
+    try:
+        response = session.get(MY_POST_URL, allow_redirects=False, timeout=10)
+    except Exception as e:
+        logging.warning(f"Could not check the Orbi session: {e}")
+        return False
+    if response.is_redirect:
+        return urlsplit(response.headers.get("Location", "")).netloc != LOGIN_HOST
+    return response.status_code == 200
+
+def authenticated_session(path=DEFAULT_COOKIE_PATH, pool_size=10, cache=None):
+    """
+    Returns a logged-in requests.Session built from the saved cookies, or None if there is
+    no valid saved session. Authenticated reads through it do not need a browser.
+    """
+    cookies = load_cookies(path)
+    if not cookies:
+        return None
+    session = session_from_cookies(cookies, pool_size, cache)
+    if not is_logged_in(session):
+        session.close()
+        return None
+    return session
+
+def login(driver, username, password, timeout=10):
+    """Logs the browser in through the login form. Returns True once the site has redirected away from it."""
+    driver.get(LOGIN_URL)
+    username_field = element_present(driver, By.NAME, "username", timeout)
+    if not username_field:
+        return False
+    try:
+        username_field.send_keys(username)
+        password_field = driver.find_element(By.NAME, "password")
+        password_field.send_keys(password)
+        password_field.send_keys(Keys.RETURN)
+    except NoSuchElementException:
+        return False
+    # Done as soon as the site leaves the login page, instead of a fixed sleep
+    return left_host(driver, LOGIN_HOST, timeout) is not None
+
+def restore_session(driver, cookies):
+    """Loads saved cookies into the browser. Returns False if none of them could be set."""
+    driver.get(COOKIE_LANDING_URL)
+    restored = 0
+    for cookie in cookies:
+        try:
+            driver.add_cookie(cookie)
+            restored += 1
+        except WebDriverException:
+            pass  # Cookies for other hosts (e.g. login.orbi.kr) cannot be set from orbi.kr
+    return restored > 0
+
+def ensure_logged_in(driver, credentials=prompt_credentials, path=DEFAULT_COOKIE_PATH):
+    """
+    Makes sure the browser is logged in to Orbi, reusing the session saved at path when it is
+    still valid and logging in (then saving the new session) otherwise.
+
+    credentials is a (username, password) tuple or a callable returning one. It is only used
+    when a fresh login is needed, so callers can defer prompting. Returns True on success.
+    """
+    cookies = load_cookies(path)
+    if cookies:
+        session = session_from_cookies(cookies, pool_size=1)
+        valid = is_logged_in(session)
+        session.close()
+        if valid and restore_session(driver, cookies):
+            logging.info("Restored saved Orbi session.")
+            return True
+        logging.info("Saved Orbi session is no longer valid. Logging in again.")
+
+    username, password = credentials() if callable(credentials) else credentials
+    if not login(driver, username, password):
+        logging.error("Login failed.")
+        return False
+
+    save_cookies(driver.get_cookies(), path)
+    logging.info("Login successful. Session saved.")
+    return True
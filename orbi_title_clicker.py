@@ -1,37 +1,110 @@
-from selenium import webdriver
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException, UnexpectedAlertPresentException
+from selenium.common.exceptions import UnexpectedAlertPresentException
+import json
 import logging
-import getpass
+import os
+import requests
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+from orbi_driver import BrowserPool, make_driver
+from orbi_dom import extract_records
+from orbi_http import SITE_URL, RateLimiter
+from orbi_session import MY_POST_URL, authenticated_session, ensure_logged_in, prompt_credentials
+from orbi_wait import alert_present, element_present, log_wait_stats, url_changed
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
 
+DELETE_URL = f"{SITE_URL}/modify/"
+DEFAULT_DELETE_REPORT = "delete_report.jsonl"
+# Batch deletion: browsers working in parallel and the deletions started per second across all of them
+DELETE_WORKERS = 2
+DELETE_MAX_RATE = 0.5
+# How long a confirmed deletion gets to take effect before the post is checked for the last time
+DELETE_CONFIRM_TIMEOUT = 5
+
+# What extract_posts reads from each post in the list
+POST_FIELDS = {"title": ("p.title", "text"), "href": ("a", "href")}
+
 def wait_for_element(driver, by, value, timeout=10):
     """
     Wait for an element to be located and return it.
+    Returns as soon as it appears; the wait time is recorded in orbi_wait.WAIT_STATS.
     """
-    try:
-        return WebDriverWait(driver, timeout).until(EC.presence_of_element_located((by, value)))
-    except TimeoutException:
+    element = element_present(driver, by, value, timeout)
+    if element is None:
         logging.error(f"Element with {by} = {value} not found within {timeout} seconds.")
-        return None
+    return element
 
 def handle_alert(driver, timeout=5):
     """
     Handles an alert if it appears within the specified timeout period.
     """
-    try:
-        alert = WebDriverWait(driver, timeout).until(EC.alert_is_present())
-        logging.info(f"Alert detected: {alert.text}")
-        alert.accept()
-        logging.info("Alert accepted.")
-        return True
-    except TimeoutException:
+    alert = alert_present(driver, timeout)
+    if not alert:
         logging.info("No alert appeared.")
         return False
+    logging.info(f"Alert detected: {alert.text}")
+    alert.accept()
+    logging.info("Alert accepted.")
+    return True
+
+def make_post(record):
+    """Turns an extracted {title, href} record into {title, href: post number}, or None if either is missing."""
+    title = (record.get("title") or "").strip()
+    href = record.get("href")
+    if not title or not href:
+        return None
+    return {"title": title, "href": href.split("/")[-1]}
+
+def parse_post_list(html):
+    """Returns the posts on a /my/post page, like extract_posts does for one page, or None if it has no post list."""
+    soup = BeautifulSoup(html, "html.parser", parse_only=SoupStrainer("ul", class_="post-list"))
+    post_list = soup.find("ul", class_="post-list")
+    if not post_list:
+        return None
+    records = []
+    for item in post_list.find_all("li", recursive=False):
+        title = item.select_one("p.title")
+        link = item.find("a", href=True)
+        records.append({"title": title.get_text() if title else None, "href": link["href"] if link else None})
+    return [post for post in map(make_post, records) if post]
+
+def fetch_post_list(session, page):
+    """Fetches one /my/post page over HTTP. Returns its posts, or None on failure."""
+    try:
+        response = session.get(MY_POST_URL, params={"page": page}, allow_redirects=False, timeout=10)
+    except requests.RequestException as e:
+        logging.error(f"Error fetching page {page}: {e}")
+        return None
+    if response.status_code != 200:
+        # A redirect here means the session has been logged out
+        logging.error(f"Failed to fetch page {page}. Status code: {response.status_code}")
+        return None
+    return parse_post_list(response.content)
+
+def extract_posts_http(session, workers=4):
+    """
+    Same as extract_posts, but fetches the /my/post pages over a logged-in requests.Session
+    (see orbi_session.authenticated_session), `workers` pages at a time. Stops at the first
+    page without posts.
+    """
+    posts = []
+    page = 1
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = range(page, page + workers)
+            logging.info(f"Fetching pages {batch.start}-{batch.stop - 1}...")
+            for number, page_posts in zip(batch, executor.map(lambda n: fetch_post_list(session, n), batch)):
+                if not page_posts:
+                    logging.info(f"No posts on page {number}. Ending pagination.")
+                    return posts
+                posts.extend(page_posts)
+            page += workers
 
 def extract_posts(driver):
     """
@@ -42,33 +115,23 @@ def extract_posts(driver):
 
     while True:
         logging.info(f"Processing page {page}...")
-        driver.get(f"https://orbi.kr/my/post?page={page}")
+        driver.get(f"{MY_POST_URL}?page={page}")
 
         try:
             if not wait_for_element(driver, By.CLASS_NAME, "post-list"):
                 logging.error(f"Post list not found on page {page}.")
                 break
 
-            post_elements = driver.find_elements(By.CSS_SELECTOR, "ul.post-list > li")
-            if not post_elements:
+            # The whole page's post list comes back in one call
+            records = extract_records(driver, "ul.post-list > li", POST_FIELDS)
+            if not records:
                 logging.info("No more posts found. Ending pagination.")
                 break
 
-            valid_posts_found = False
-            for post in post_elements:
-                try:
-                    title_element = post.find_element(By.CSS_SELECTOR, "p.title")
-                    title = title_element.text.strip() if title_element.text.strip() else None
-                    href = post.find_element(By.TAG_NAME, "a").get_attribute("href").split("/")[-1] \
-                        if post.find_element(By.TAG_NAME, "a").get_attribute("href") else None
-
-                    if title and href:
-                        posts.append({"title": title, "href": href})
-                        valid_posts_found = True
-                except Exception as e:
-                    logging.warning(f"Failed to extract post details: {e}")
-
-            if not valid_posts_found:
+            page_posts = [post for post in map(make_post, records) if post]
+            posts.extend(page_posts)
+
+            if not page_posts:
                 logging.info("No valid posts found on this page. Ending pagination.")
                 break
 
@@ -85,59 +148,231 @@ def extract_posts(driver):
 
     return posts
 
-def delete_post(driver, post_number):
+def post_exists(session, post_number):
+    """Checks over HTTP whether a post is still up. Returns None if that cannot be told."""
+    try:
+        response = session.get(f"{SITE_URL}/{post_number}", allow_redirects=False, timeout=10)
+    except requests.RequestException as e:
+        logging.warning(f"Could not check post {post_number}: {e}")
+        return None
+    if response.status_code in (404, 410) or response.is_redirect:
+        return False
+    if response.status_code == 200:
+        return True
+    return None
+
+def post_gone(session, post_number, timeout=DELETE_CONFIRM_TIMEOUT, interval=0.5):
+    """
+    Polls post_exists until the post is gone. Returns True once it is, False if it is still up
+    after `timeout` seconds, or None if that cannot be told.
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        exists = post_exists(session, post_number)
+        if not exists:
+            return None if exists is None else True
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(interval)
+
+def delete_post(driver, post_number, session=None):
     """
     Navigate to a post's modify page and delete the post.
     Handle confirmation alerts if they appear.
+    Returns (status, detail): "deleted" once the deletion is confirmed, otherwise "failed".
+    With a logged-in session, the deletion only counts as confirmed once the post is gone.
     """
     try:
         logging.info(f"Attempting to delete post: {post_number}")
-        driver.get(f"https://orbi.kr/modify/{post_number}")
+        driver.get(f"{DELETE_URL}{post_number}")
         if not wait_for_element(driver, By.CLASS_NAME, "button.delete"):
             logging.error(f"Delete button not found for post {post_number}.")
-            return
+            return "failed", "delete button not found"
 
+        modify_url = driver.current_url
         delete_button = driver.find_element(By.CLASS_NAME, "button.delete")
         delete_button.click()
 
-        if handle_alert(driver):
-            logging.info(f"Post {post_number} deletion confirmed.")
-        else:
+        if not handle_alert(driver):
             logging.warning("No confirmation alert appeared. Deletion may not have been confirmed.")
+            return "failed", "no confirmation alert"
+
+        # The browser leaves the modify page once its delete request has gone through
+        url_changed(driver, modify_url, timeout=DELETE_CONFIRM_TIMEOUT)
+
+        if session and post_gone(session, post_number) is False:
+            logging.warning(f"Post {post_number} is still up after the deletion was confirmed.")
+            return "failed", "post still exists"
+
+        logging.info(f"Post {post_number} deletion confirmed.")
+        return "deleted", None
 
     except Exception as e:
         logging.error(f"Failed to delete post {post_number}: {e}")
+        return "failed", str(e)
 
-def main():
-    # Set Chrome options
-    chrome_options = webdriver.ChromeOptions()
-    chrome_options.add_argument("--headless")
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--window-size=1920x1080")
+class DeleteReport:
+    """
+    Append-only JSON Lines record of a batch deletion, one line per post:
+    {"post", "title", "status", "detail", "at"} with status deleted, failed or skipped.
+    Each line is flushed as it is written, so an interrupted batch can be resumed:
+    posts already recorded as deleted are skipped on the next run.
+    """
+
+    def __init__(self, path=DEFAULT_DELETE_REPORT):
+        self.path = path
+        self.deleted = set()
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # A line cut short by an interruption
+                    if entry.get("status") == "deleted":
+                        self.deleted.add(str(entry["post"]))
+        self.counts = {"deleted": 0, "failed": 0, "skipped": 0}
+        self._lock = threading.Lock()
+        self.file = open(path, "a", encoding="utf-8")
+
+    def record(self, post, status, detail=None):
+        entry = {"post": post["href"], "title": post["title"], "status": status, "detail": detail, "at": time.time()}
+        with self._lock:
+            self.file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.file.flush()
+            self.counts[status] += 1
+            if status == "deleted":
+                self.deleted.add(str(post["href"]))
+
+    def summary(self):
+        return (
+            f"Deleted {self.counts['deleted']} posts, {self.counts['failed']} failed, "
+            f"{self.counts['skipped']} skipped. Report: {self.path}"
+        )
+
+    def close(self):
+        self.file.close()
+
+def delete_posts(posts, workers=2, max_rate=0.5, dry_run=False, report_path=DEFAULT_DELETE_REPORT,
+                 credentials=prompt_credentials):
+    """
+    Deletes the given posts ({title, href} dicts from extract_posts) with `workers` browsers
+    in parallel, starting at most max_rate deletions per second. Every outcome goes to a
+    DeleteReport at report_path, and posts it already lists as deleted are skipped, so running
+    the same batch again resumes it. A dry run only logs what would be deleted.
+    credentials is used as in orbi_session.ensure_logged_in, at most once for the whole batch.
+    Returns the report's counts.
+    """
+    report = DeleteReport(report_path)
+    pending = []
+    for post in posts:
+        if str(post["href"]) in report.deleted:
+            logging.info(f"Post {post['href']} was already deleted in an earlier run. Skipping.")
+            if dry_run:
+                report.counts["skipped"] += 1
+            else:
+                report.record(post, "skipped", "already deleted")
+        else:
+            pending.append(post)
+
+    if dry_run:
+        for post in pending:
+            logging.info(f"[dry run] Would delete post {post['href']}: {post['title']}")
+        report.close()
+        logging.info(f"[dry run] {len(pending)} posts would be deleted, {report.counts['skipped']} already were.")
+        return report.counts
+
+    # Every browser in the pool is logged in from the saved session before its first deletion
+    rate_limiter = RateLimiter(max_rate)
+    session = authenticated_session()
+    credentials_lock = threading.Lock()
+    resolved_credentials = []
+
+    def shared_credentials():
+        # Workers that need a fresh login ask for the credentials once between them
+        with credentials_lock:
+            if not resolved_credentials:
+                resolved_credentials.append(credentials() if callable(credentials) else credentials)
+            return resolved_credentials[0]
+
+    def delete(pool, post):
+        with pool.borrow() as driver:
+            # Marked on the driver itself: a replacement for a dead browser may reuse its id()
+            if not getattr(driver, "orbi_logged_in", False):
+                if not ensure_logged_in(driver, shared_credentials):
+                    report.record(post, "failed", "login failed")
+                    return
+                driver.orbi_logged_in = True
+            rate_limiter.wait(DELETE_URL)
+            status, detail = delete_post(driver, post["href"], session)
+        report.record(post, status, detail)
 
     try:
-        # Input credentials
-        username = input("Enter your Orbi username/email: ")
-        password = getpass.getpass("Enter your Orbi password: ")
-
-        # Initialize WebDriver
-        driver = webdriver.Chrome(options=chrome_options)
-        driver.get("https://login.orbi.kr/login")
-
-        # Log in to the site
-        wait_for_element(driver, By.NAME, "username").send_keys(username)
-        password_field = wait_for_element(driver, By.NAME, "password")
-        password_field.send_keys(password)
-        password_field.submit()
-
-        if not wait_for_element(driver, By.CLASS_NAME, "post-list"):
-            logging.error("Login failed or post list not found.")
+        with BrowserPool("interactive", size=workers) as pool:
+            if session is None:
+                # No valid saved session: log in once up front, so the workers only restore the saved one
+                with pool.borrow() as driver:
+                    if not ensure_logged_in(driver, shared_credentials):
+                        for post in pending:
+                            report.record(post, "failed", "login failed")
+                        return report.counts
+                    driver.orbi_logged_in = True
+                session = authenticated_session()
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                for future in [executor.submit(delete, pool, post) for post in pending]:
+                    try:
+                        future.result()
+                    except Exception as e:
+                        logging.error(f"Error deleting post: {e}")
+    finally:
+        if session:
+            session.close()
+        report.close()
+        logging.info(report.summary())
+    return report.counts
+
+def parse_selection(text, count):
+    """
+    Parses a selection such as "1, 3, 5-9" or "all" into sorted 1-based post numbers.
+    Numbers outside 1..count are logged and dropped.
+    """
+    if text.strip().lower() == "all":
+        return list(range(1, count + 1))
+    numbers = set()
+    for part in text.split(","):
+        part = part.strip()
+        bounds = part.split("-", 1)
+        if not all(bound.strip().isdigit() for bound in bounds):
+            if part:
+                logging.warning(f"Invalid selection: {part}")
+            continue
+        low, high = int(bounds[0]), int(bounds[-1])
+        for num in range(low, high + 1):
+            if 1 <= num <= count:
+                numbers.add(num)
+            else:
+                logging.warning(f"Invalid post number: {num}")
+    return sorted(numbers)
+
+def main():
+    try:
+        # Initialize WebDriver (headless, images blocked, eager page loads)
+        driver = make_driver("interactive")
+
+        # Log in, reusing the saved session if there is one (credentials are only prompted for if not)
+        if not ensure_logged_in(driver):
+            logging.error("Login failed.")
             return
 
         logging.info("Login successful!")
 
-        # Extract posts
-        posts = extract_posts(driver)
+        # Extract posts, over HTTP with the saved session when possible
+        session = authenticated_session()
+        if session:
+            posts = extract_posts_http(session)
+            session.close()
+        else:
+            posts = extract_posts(driver)
         if not posts:
             logging.info("No posts found.")
             return
@@ -147,25 +382,28 @@ def main():
             logging.info(f"{idx}. Title: {post['title']}, HREF: {post['href']}")
 
         # Ask the user which posts to delete
-        to_delete = input("Enter the numbers of the posts to delete (comma-separated): ")
-        try:
-            to_delete = [int(num.strip()) for num in to_delete.split(",") if num.strip().isdigit()]
-        except ValueError:
-            logging.error("Invalid input. Please enter numbers only.")
+        to_delete = input("Enter the numbers of the posts to delete (e.g. 1, 3, 5-9 or all): ")
+        selected = [posts[num - 1] for num in parse_selection(to_delete, len(posts))]
+        if not selected:
+            logging.info("Nothing selected.")
             return
 
-        for num in sorted(to_delete):
-            if 1 <= num <= len(posts):
-                post = posts[num - 1]
-                delete_post(driver, post["href"])
-            else:
-                logging.warning(f"Invalid post number: {num}")
+        answer = input(f"Delete {len(selected)} posts? Type 'yes' to delete or 'dry' for a dry run: ").strip().lower()
+        if answer not in ("yes", "dry"):
+            logging.info("Cancelled.")
+            return
+
+        # The batch runs in its own browsers; this one is no longer needed
+        driver.quit()
+        del driver
+        delete_posts(selected, DELETE_WORKERS, DELETE_MAX_RATE, dry_run=answer == "dry")
 
     except Exception as e:
         logging.error(f"An error occurred: {e}")
     finally:
+        log_wait_stats()
         if 'driver' in locals():
             driver.quit()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
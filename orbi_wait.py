@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from collections import deque
+from urllib.parse import urlsplit
+
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from orbi_metrics import METRICS
+
+# How often conditions are re-checked; small so waits end soon after the page is ready
+POLL_FREQUENCY = 0.05
+
+class WaitStats:
+    """Records how long each named wait took, so timeouts can be tuned from real data. Thread-safe."""
+
+    def __init__(self, samples=1000):
+        self.samples = samples
+        self._waits = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, seconds, timed_out):
+        with self._lock:
+            stats = self._waits.setdefault(name, {"count": 0, "timeouts": 0, "durations": deque(maxlen=self.samples)})
+            stats["count"] += 1
+            stats["timeouts"] += timed_out
+            if not timed_out:
+                stats["durations"].append(seconds)
+
+    def snapshot(self):
+        """Returns {name: {count, timeouts, p50, p90, max}} with durations in seconds."""
+        with self._lock:
+            waits = {name: (stats["count"], stats["timeouts"], sorted(stats["durations"]))
+                     for name, stats in self._waits.items()}
+        result = {}
+        for name, (count, timeouts, durations) in waits.items():
+            def percentile(fraction):
+                return durations[min(len(durations) - 1, int(fraction * len(durations)))] if durations else None
+            result[name] = {
+                "count": count,
+                "timeouts": timeouts,
+                "p50": percentile(0.5),
+                "p90": percentile(0.9),
+                "max": durations[-1] if durations else None,
+            }
+        return result
+
+    def summary(self):
+        """Returns one line per wait: how often it ran, how often it timed out and how long it took."""
+        lines = []
+        for name, stats in sorted(self.snapshot().items()):
+            if stats["p50"] is None:
+                lines.append(f"{name}: {stats['count']} waits, all timed out")
+            else:
+                lines.append(
+                    f"{name}: {stats['count']} waits, {stats['timeouts']} timeouts, "
+                    f"p50 {stats['p50'] * 1000:.0f}ms, p90 {stats['p90'] * 1000:.0f}ms, max {stats['max'] * 1000:.0f}ms"
+                )
+        return lines
+
+WAIT_STATS = WaitStats()
+
+def log_wait_stats(log=logging.info):
+    """Logs the WAIT_STATS summary through `log` (logging.info by default)."""
+    for line in WAIT_STATS.summary():
+        log(f"Wait {line}")
+
+def wait_until(driver, condition, timeout=10, name="condition", warn_on_timeout=True):
+    """
+    Waits until condition(driver) returns something truthy and returns it, or None on timeout.
+    Returns as soon as the condition holds. The time taken is recorded under `name` in WAIT_STATS.
+    """
+    start = time.monotonic()
+    try:
+        result = WebDriverWait(driver, timeout, poll_frequency=POLL_FREQUENCY).until(condition)
+    except TimeoutException:
+        WAIT_STATS.record(name, time.monotonic() - start, timed_out=True)
+        METRICS.observe("orbi_webdriver_wait_seconds", time.monotonic() - start, wait=name, outcome="timeout")
+        if warn_on_timeout:
+            logging.warning(f"Timed out after {timeout}s waiting for {name}.")
+        return None
+    elapsed = time.monotonic() - start
+    WAIT_STATS.record(name, elapsed, timed_out=False)
+    METRICS.observe("orbi_webdriver_wait_seconds", elapsed, wait=name, outcome="ok")
+    logging.debug(f"Waited {elapsed * 1000:.0f}ms for {name}.")
+    return result
+
+def element_present(driver, by, value, timeout=10):
+    """Waits for an element to be in the DOM and returns it, or None."""
+    return wait_until(driver, EC.presence_of_element_located((by, value)), timeout, f"element {value}")
+
+def element_clickable(driver, by, value, timeout=10):
+    """Waits for an element to be visible and enabled and returns it, or None."""
+    return wait_until(driver, EC.element_to_be_clickable((by, value)), timeout, f"clickable {value}")
+
+def url_changed(driver, from_url, timeout=10):
+    """Waits for the browser to navigate away from from_url. Returns the new URL, or None."""
+    return wait_until(driver, lambda d: d.current_url if d.current_url != from_url else None,
+                      timeout, "URL change")
+
+def left_host(driver, host, timeout=10):
+    """Waits for the browser to be on any host other than `host` (e.g. after a login redirect)."""
+    return wait_until(driver, lambda d: d.current_url if urlsplit(d.current_url).netloc != host else None,
+                      timeout, f"leaving {host}")
+
+def cookie_set(driver, name, timeout=10):
+    """Waits for a cookie to be set and returns it, or None."""
+    return wait_until(driver, lambda d: d.get_cookie(name), timeout, f"cookie {name}")
+
+def alert_present(driver, timeout=5):
+    """Waits for a JavaScript alert and returns it, or None. Often no alert is expected, so timeouts are not logged."""
+    return wait_until(driver, EC.alert_is_present(), timeout, "alert", warn_on_timeout=False)
+
+def document_ready(driver, timeout=10):
+    """Waits until the page and its subresources have finished loading."""
+    return wait_until(driver, lambda d: d.execute_script("return document.readyState") == "complete",
+                      timeout, "document ready")